@@ -0,0 +1,75 @@
+import os
+import streamlit as st
+import pandas as pd
+
+# Daily average above this counts as an unhealthy day
+UNHEALTHY_THRESHOLD = 37.5
+
+# Most bars the historical chart sends to the browser; longer ranges are shown as
+# weekly, then monthly averages. Override with PM25_HISTORY_POINT_BUDGET.
+HISTORY_POINT_BUDGET = int(os.environ.get("PM25_HISTORY_POINT_BUDGET", "180"))
+
+# Resolution -> pandas period used to bucket the daily means
+RESOLUTION_PERIODS = {'weekly': 'W', 'monthly': 'M'}
+
+def _compute_aggregates(df):
+    """
+    Builds every rollup the dashboard needs from the raw hourly frame in one pass.
+    - daily:   index 'Date' (midnight Timestamp), columns mean/max/min/count of hourly PM2.5
+    - monthly: index (year, month), columns mean/max/min of the daily means and day count
+    - yearly:  index year, columns days, unhealthy_days (daily mean > 37.5) and exposure
+               (sum of daily means, used for the cigarette equivalent)
+    """
+    day_key = df['Datetime'].dt.normalize().rename('Date')
+    # Readings are stored as float32; accumulate the rollups in float64
+    pm = df['PM2.5'].astype('float64')
+    daily = pm.groupby(day_key).agg(['mean', 'max', 'min', 'count']).sort_index()
+
+    years = daily.index.year.rename('year')
+    months = daily.index.month.rename('month')
+    monthly = daily['mean'].groupby([years, months]).agg(['mean', 'max', 'min', 'count'])
+    monthly = monthly.rename(columns={'count': 'days'})
+
+    unhealthy = (daily['mean'] > UNHEALTHY_THRESHOLD)
+    yearly = pd.DataFrame({
+        'days': daily['mean'].groupby(years).count(),
+        'unhealthy_days': unhealthy.groupby(years).sum(),
+        'exposure': daily['mean'].groupby(years).sum(),
+    })
+    return {'daily': daily, 'monthly': monthly, 'yearly': yearly}
+
+def choose_resolution(n_days, budget=HISTORY_POINT_BUDGET):
+    """Finest of daily/weekly/monthly whose bar count for n_days stays within budget."""
+    if n_days <= budget:
+        return 'daily'
+    if n_days / 7 <= budget:
+        return 'weekly'
+    return 'monthly'
+
+def downsample_daily(daily_mean, resolution):
+    """
+    Buckets a daily-mean series into weekly (Mon-Sun) or calendar-month averages.
+    Returns a frame indexed by bucket start with columns mean (average of the daily
+    means), max (peak daily mean, so haze spikes stay visible in the hover) and
+    first/last (the first and last day with data in the bucket).
+    """
+    key = daily_mean.index.to_period(RESOLUTION_PERIODS[resolution]).start_time
+    days = pd.Series(daily_mean.index, index=daily_mean.index)
+    buckets = daily_mean.groupby(key).agg(['mean', 'max'])
+    buckets[['first', 'last']] = days.groupby(key).agg(['min', 'max'])
+    return buckets
+
+@st.cache_resource(max_entries=2)
+def _cached_aggregates(_snapshot, version):
+    # '_snapshot' is not hashed by Streamlit: the snapshot version is the cache key.
+    # cache_resource hands out the same tables on every hit (cache_data would unpickle a copy).
+    return _compute_aggregates(_snapshot.df)
+
+def get_aggregates(snapshot):
+    """
+    Returns the daily/monthly/yearly tables for this data Snapshot.
+    Computed once per snapshot version, so reruns and widget interactions only read
+    the precomputed tables. Like the Snapshot itself, the same frames are shared by every
+    session and rerun without copying: callers must not mutate them.
+    """
+    return _cached_aggregates(snapshot, snapshot.version)
@@ -11,6 +11,8 @@ from ui_components import (
     inject_custom_css,
 )
 from translations import TRANSLATIONS as MAIN_T
+from utils import format_reading_time
+from instrumentation import RenderProfile, profiling_enabled, record_rows
 
 # --- Translations ---
 t = MAIN_T
@@ -39,35 +41,45 @@ if col2.button('English'):
 
 lang = st.session_state.lang
 
+# --- Render Profiling (opt-in: ?debug=1 or PM25_PROFILE=1) ---
+profile = RenderProfile(profiling_enabled())
+
 # --- Data Loading ---
-df = load_data()
+with profile.section('load_data'):
+    snapshot = load_data()
+    if snapshot is not None:
+        record_rows(len(snapshot))
 
-if df is None or df.empty:
+if snapshot is None or snapshot.empty:
     st.warning(t[lang]['no_data_for_year'])
     st.stop()
 
 # --- Header ---
 st.title(t[lang]['header'])
 
-latest_dt = df['Datetime'][0]
-if lang == 'th':
-    thai_year = latest_dt.year + 543
-    thai_month = t['th']['month_names'][latest_dt.month - 1]
-    date_str = latest_dt.strftime(f"%d {thai_month} {thai_year}, %H:%M:%S")
-else:
-    date_str = latest_dt.strftime('%d %B %Y, %H:%M:%S')
+date_str = format_reading_time(snapshot.latest_datetime, lang, t)
 
 st.write("") # Spacer
 
 # --- Main Display ---
-display_realtime_pm(df, lang, t, date_str)
+# The realtime card, calendar and historical sections are st.fragment functions: their
+# buttons, selectboxes and date inputs rerun only that section, not the whole page.
+with profile.section('display_realtime_pm'):
+    display_realtime_pm(snapshot, lang, t, date_str)
 st.divider()
-display_24hr_chart(df, lang, t)
+with profile.section('display_24hr_chart'):
+    display_24hr_chart(snapshot, lang, t)
 st.divider()
-display_monthly_calendar(df, lang, t)
+with profile.section('display_monthly_calendar'):
+    display_monthly_calendar(snapshot, lang, t)
 st.divider()
-display_historical_data(df, lang, t)
+with profile.section('display_historical_data'):
+    display_historical_data(snapshot, lang, t)
 st.divider()
-display_health_impact(df, lang, t)
+with profile.section('display_health_impact'):
+    display_health_impact(snapshot, lang, t)
 st.divider()
-display_external_assessment(lang, t)
+with profile.section('display_external_assessment'):
+    display_external_assessment(lang, t)
+
+profile.finish()
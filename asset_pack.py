@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+
+# Versioned local copy of the fonts and icons used by the report card, committed with
+# the app and read-only at runtime. Build or refresh it with: python build_asset_pack.py
+ASSET_PACK_DIR = os.environ.get("PM25_ASSET_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets"))
+MANIFEST_FILE = "manifest.json"
+
+# Assets the renderer had to download (network fallback) are saved here by add_asset, in
+# the same layout, so later processes on this host skip the download. Never the source tree.
+ASSET_CACHE_DIR = os.environ.get(
+    "PM25_ASSET_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pm25-dashboard", "assets"))
+
+# manifest.json layout:
+# {
+#   "version": 1,
+#   "assets": {
+#     "<name>": {
+#       "url": "<original download URL>",
+#       "file": "<path relative to the pack dir>",
+#       "sha256": "<hex digest>",
+#       "variants": {"<size>": {"file": ..., "sha256": ..., "width": ..., "height": ...}}  (icons only)
+#     }
+#   }
+# }
+
+_pack = None
+_pack_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _read_verified(pack_dir, entry):
+    """Reads one pack file and returns its bytes, or None if missing or the checksum does not match."""
+    path = os.path.join(pack_dir, entry['file'])
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if sha256_bytes(data) != entry['sha256']:
+        print(f"Asset pack checksum mismatch, ignoring {entry['file']}")
+        return None
+    return data
+
+def _load_pack(pack_dir):
+    pack = {'version': None, 'by_url': {}, 'variants': {}}
+    try:
+        with open(os.path.join(pack_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return pack
+
+    pack['version'] = manifest.get('version')
+    for entry in manifest.get('assets', {}).values():
+        data = _read_verified(pack_dir, entry)
+        if data is not None:
+            pack['by_url'][entry['url']] = data
+        for size, variant in entry.get('variants', {}).items():
+            variant_data = _read_verified(pack_dir, variant)
+            if variant_data is not None:
+                pack['variants'][(entry['url'], int(size))] = variant_data
+    return pack
+
+def bundled_pack_present():
+    """True if a built asset pack (manifest.json) is shipped in ASSET_PACK_DIR."""
+    return os.path.exists(os.path.join(ASSET_PACK_DIR, MANIFEST_FILE))
+
+def get_asset_pack():
+    """
+    Loads and verifies the asset pack once per process; later calls return the same dict.
+    The bundled pack comes first; previously downloaded assets from ASSET_CACHE_DIR only
+    fill in what it lacks. The version is always the bundled pack's.
+    """
+    global _pack
+    if _pack is None:
+        with _pack_lock:
+            if _pack is None:
+                pack = _load_pack(ASSET_PACK_DIR)
+                downloaded = _load_pack(ASSET_CACHE_DIR)
+                for url, data in downloaded['by_url'].items():
+                    pack['by_url'].setdefault(url, data)
+                for key, data in downloaded['variants'].items():
+                    pack['variants'].setdefault(key, data)
+                _pack = pack
+    return _pack
+
+def get_asset_bytes(url):
+    """Returns the packed bytes for an asset URL, or None if it is not in the pack."""
+    return get_asset_pack()['by_url'].get(url)
+
+def get_variant_bytes(url, size):
+    """Returns a pre-sized PNG variant of a packed icon, or None if the pack has none at that size."""
+    return get_asset_pack()['variants'].get((url, size))
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def add_asset(key, url, rel_path, data, pack_dir=None):
+    """
+    Stores downloaded asset bytes in the download cache (ASSET_CACHE_DIR by default) and
+    records them (with their checksum) in its manifest.json, keeping any pre-sized variants
+    already listed for that entry. Later processes then load the asset locally instead of
+    downloading it again. Returns False if the directory is not writable.
+    """
+    pack_dir = pack_dir or ASSET_CACHE_DIR
+    manifest_path = os.path.join(pack_dir, MANIFEST_FILE)
+    with _write_lock:
+        try:
+            _write_atomic(os.path.join(pack_dir, rel_path), data)
+            # Re-read the manifest: another process may have added entries since startup.
+            # If two processes race, one entry is lost and simply downloaded again later.
+            try:
+                with open(manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = {'version': 1, 'assets': {}}
+            entry = manifest.setdefault('assets', {}).setdefault(key, {})
+            entry.update({'url': url, 'file': rel_path, 'sha256': sha256_bytes(data)})
+            _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+        except OSError as e:
+            # The pack is only a startup accelerator; never fail a render over it
+            print(f"Could not write {rel_path} to the asset cache: {e}")
+            return False
+    if pack_dir == ASSET_CACHE_DIR:
+        get_asset_pack()['by_url'].setdefault(url, data)
+    return True
@@ -0,0 +1,123 @@
+"""
+Renders report cards headless and in parallel, e.g. to pre-generate cards for scheduled posting.
+
+Each job is a (pm25, lang, timestamp) triple. Jobs come from any combination of:
+    --levels          one card per AQI level x language (representative reading per level)
+    --day YYYY-MM-DD  one card per logged hour of that day, per language (reads the data source)
+    --jobs FILE       CSV with the columns pm25,lang,timestamp
+
+Jobs are spread over a process pool. Each worker loads the fonts and icons once and
+reuses them for all its cards. Files are written to --out, and throughput (cards/sec)
+is printed at the end.
+
+Usage:
+    python batch_cards.py --levels --day 2026-03-15 [--workers N] [--format png|webp|jpeg]
+                          [--width 1080] [--out cards/]
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from translations import TRANSLATIONS
+from utils import LEVEL_READINGS, aqi_level_index, format_reading_time, get_aqi_level
+
+DEFAULT_OUT_DIR = "cards"
+
+def level_jobs(timestamp, langs):
+    return [(pm, lang, timestamp) for lang in langs for pm in LEVEL_READINGS]
+
+def day_jobs(day, langs):
+    """One job per logged reading on 'day' (hourly in practice), using the live data source."""
+    from data_loader import Snapshot, sync_data
+
+    snapshot = Snapshot(sync_data(), 0)
+    day_data = snapshot.day_slice(day)
+    return [(float(pm), lang, ts.to_pydatetime())
+            for lang in langs
+            for ts, pm in zip(day_data['Datetime'], day_data['PM2.5'])]
+
+def file_jobs(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(float(row['pm25']), row['lang'], pd.Timestamp(row['timestamp']).to_pydatetime())
+                for row in csv.DictReader(f)]
+
+def job_filename(job, fmt):
+    pm, lang, timestamp = job
+    level_no = aqi_level_index(pm) + 1
+    return f"pm25_report_{timestamp:%Y%m%d_%H%M}_{lang}_L{level_no}_{pm:.0f}.{fmt}"
+
+# --- Worker process ---
+def _init_worker():
+    """Loads the card assets once per worker so every job reuses the parsed fonts and icons."""
+    import card_renderer
+
+    card_renderer.icon_atlas.get('logo', 220)
+    for weight in card_renderer.FONT_URLS:
+        card_renderer.font_registry.get(weight, 30)
+
+def _render_job(job, out_dir, fmt, width):
+    from card_renderer import generate_report_card
+
+    pm, lang, timestamp = job
+    t = TRANSLATIONS
+    level_text, color, emoji, advice = get_aqi_level(pm, lang, t)
+    card_bytes = generate_report_card(pm, level_text, color, emoji, advice['details'],
+                                      format_reading_time(timestamp, lang, t), lang, t, fmt=fmt, width=width)
+    path = os.path.join(out_dir, job_filename(job, fmt))
+    with open(path, "wb") as f:
+        f.write(card_bytes)
+    return path, len(card_bytes), os.getpid()
+
+def render_batch(jobs, out_dir, fmt='png', width=None, workers=None):
+    """
+    Renders every job across a process pool.
+    Returns ([(path, bytes written, worker pid), ...], elapsed seconds, workers used).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        results = list(pool.map(_render_job, jobs, [out_dir] * len(jobs), [fmt] * len(jobs),
+                                [width] * len(jobs), chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    return results, elapsed, workers
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", action="store_true", help="every AQI level x language")
+    parser.add_argument("--day", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="one card per logged hour of this day")
+    parser.add_argument("--jobs", help="CSV file with pm25,lang,timestamp columns")
+    parser.add_argument("--timestamp", type=pd.Timestamp, help="timestamp for --levels cards (default: this hour)")
+    parser.add_argument("--lang", nargs="+", choices=list(TRANSLATIONS), default=list(TRANSLATIONS))
+    parser.add_argument("--format", dest="fmt", choices=["png", "webp", "jpeg"], default="png")
+    parser.add_argument("--width", type=int, help="downscale cards to this width (e.g. 1080)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory (default: cards/)")
+    args = parser.parse_args()
+
+    jobs = []
+    if args.levels:
+        timestamp = (args.timestamp or pd.Timestamp.now().floor('h')).to_pydatetime()
+        jobs += level_jobs(timestamp, args.lang)
+    if args.day:
+        jobs += day_jobs(args.day, args.lang)
+    if args.jobs:
+        jobs += file_jobs(args.jobs)
+    if not jobs:
+        parser.error("no jobs: pass --levels, --day and/or --jobs")
+
+    results, elapsed, workers = render_batch(jobs, args.out, args.fmt, args.width, args.workers)
+    total_kib = sum(size for _, size, _ in results) / 1024
+    print(f"Rendered {len(results)} cards ({total_kib:.0f} KiB) into {args.out} "
+          f"with {workers} worker(s) on {len({pid for _, _, pid in results})} process(es)")
+    print(f"{elapsed:.2f} s, {len(results) / elapsed:.1f} cards/sec")
+
+if __name__ == "__main__":
+    main()
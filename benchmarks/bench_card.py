@@ -0,0 +1,361 @@
+"""
+Report card benchmark and golden-image check.
+
+Renders every AQI level x language combination from translations.TRANSLATIONS with the
+local asset pack only (network fallback disabled), reports p50/p95 render time, the
+median time per phase (fonts, text_layout, canvas, icons, draw, corners, encode) and the
+canvas memory high-water mark, and compares each card against
+benchmarks/golden/<lang>_level<N>.png with a perceptual diff. A card whose golden image is
+missing counts as a failure (exit status 1) unless --update-golden is given.
+
+Each language's level-3 card is also encoded with every ENCODE_VARIANTS entry (PNG at
+several compress levels, WebP, JPEG, RGB-flattened and 1080/600-wide share sizes) and the
+encode time and output size are reported per variant, followed by the hit latency of
+CardRenderer's in-memory and on-disk card caches. No Streamlit is involved.
+
+Pillow allocates image buffers in C, outside tracemalloc's view, so peak_mem_kib only
+covers Python objects. canvas_peak_kib is measured separately: each card is rendered once
+more in a fresh interpreter with the assets already loaded, and the growth of the
+process's peak RSS (VmHWM, reset through /proc/self/clear_refs on Linux) over that
+render is reported. fixed_canvas_peak_kib repeats this with the renderer patched back to
+the former pipeline (fixed 1200x2400 canvas, cropped copy, copy-based corner rounding).
+
+Usage:
+    python benchmarks/bench_card.py [--repeat 10] [--out FILE]
+    python benchmarks/bench_card.py --update-golden     # re-record the golden PNGs
+
+Goldens must be recorded with the real asset pack (python build_asset_pack.py); cards
+rendered with the default-font fallback are not meaningful references. --update-golden
+refuses to run without a bundled pack and records the pack's manifest checksum in
+golden/asset_pack.json; a check against a different (or no) pack fails. Commit the pack
+and the goldens together.
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from io import BytesIO
+
+os.environ.setdefault("PM25_ASSET_NETWORK_FALLBACK", "0")
+
+import tempfile
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageStat
+
+from harness import ROOT, measure, print_table, write_results
+
+sys.path.insert(0, ROOT)
+
+import card_renderer
+from asset_pack import ASSET_PACK_DIR, MANIFEST_FILE, get_asset_pack, sha256_bytes
+from translations import TRANSLATIONS
+from utils import AQI_LEVELS, LEVEL_READINGS, format_reading_time, get_aqi_level
+
+GOLDEN_DIR = os.path.join(ROOT, "benchmarks", "golden")
+
+# Records which asset pack the goldens were rendered with
+GOLDEN_PACK_FILE = "asset_pack.json"
+
+# Former fixed canvas height (1200 wide), cropped to the content afterwards
+FIXED_CANVAS_HEIGHT = 2400
+
+# (name, encode_card keyword arguments) measured on one rendered card per language
+ENCODE_VARIANTS = [
+    ('png', {'fmt': 'png'}),
+    ('png_c1', {'fmt': 'png', 'compress_level': 1}),
+    ('png_c9', {'fmt': 'png', 'compress_level': 9}),
+    ('png_rgb', {'fmt': 'png', 'flatten': True}),
+    ('webp', {'fmt': 'webp'}),
+    ('jpeg', {'fmt': 'jpeg'}),
+    ('png_1080', {'fmt': 'png', 'width': 1080}),
+    ('webp_1080', {'fmt': 'webp', 'width': 1080}),
+    ('jpeg_1080', {'fmt': 'jpeg', 'width': 1080}),
+    ('webp_600', {'fmt': 'webp', 'width': 600}),
+    ('jpeg_600', {'fmt': 'jpeg', 'width': 600}),
+]
+ENCODE_LEVEL = 3
+
+# Fixed timestamp so the date pill, and therefore the pixels, are reproducible
+CARD_TIME = datetime(2026, 3, 15, 8, 0, 0)
+
+# Perceptual diff: compare lightly blurred images so sub-pixel anti-aliasing shifts are
+# ignored; fail on a visible mean shift or on any noticeable cluster of changed pixels.
+BLUR_RADIUS = 1.0
+MAX_MEAN_DIFF = 0.5
+PIXEL_DIFF_THRESHOLD = 24
+MAX_CHANGED_RATIO = 0.001
+
+def card_jobs():
+    t = TRANSLATIONS
+    for lang in t:
+        for level_no, pm in enumerate(LEVEL_READINGS, start=1):
+            yield lang, level_no, pm, format_reading_time(CARD_TIME, lang, t)
+
+def render(pm, date_str, lang, timings=None):
+    t = TRANSLATIONS
+    level_text, color, emoji, advice = get_aqi_level(pm, lang, t)
+    return card_renderer.generate_report_card(
+        pm, level_text, color, emoji, advice['details'], date_str, lang, t, timings=timings)
+
+def bench_encoders(repeat):
+    """Encode time/size of every ENCODE_VARIANTS entry for one rendered card per language."""
+    t = TRANSLATIONS
+    results = []
+    for lang in t:
+        pm = LEVEL_READINGS[ENCODE_LEVEL - 1]
+        level_text, color, emoji, advice = get_aqi_level(pm, lang, t)
+        img = card_renderer.render_report_card(
+            pm, level_text, color, emoji, advice['details'], format_reading_time(CARD_TIME, lang, t), lang, t)
+        for name, options in ENCODE_VARIANTS:
+            data = card_renderer.encode_card(img, **options)
+            encoded = Image.open(BytesIO(data))
+            stats = measure(lambda: card_renderer.encode_card(img, **options), repeat)
+            results.append({
+                'variant': name, 'lang': lang, 'size': f"{encoded.width}x{encoded.height}",
+                'mode': encoded.mode, 'kib': round(len(data) / 1024, 1),
+                'encode_p50_ms': stats['p50_ms'], 'encode_p95_ms': stats['p95_ms'],
+            })
+    return results
+
+def bench_card_caches(repeat):
+    """CardRenderer.get_card hit latency with the in-memory and on-disk caches."""
+    t = TRANSLATIONS
+    lang, pm = 'th', LEVEL_READINGS[ENCODE_LEVEL - 1]
+    level_text, color, emoji, advice = get_aqi_level(pm, lang, t)
+    date_str = format_reading_time(CARD_TIME, lang, t)
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, cache in (('memory', card_renderer.MemoryCardCache()),
+                            ('disk', card_renderer.DiskCardCache(cache_dir))):
+            renderer = card_renderer.CardRenderer(cache)
+            renderer.get_card(pm, level_text, color, emoji, advice['details'], date_str, lang, t)
+            stats = measure(lambda: renderer.get_card(pm, level_text, color, emoji, advice['details'],
+                                                      date_str, lang, t), repeat)
+            results.append({'cache': name, 'hit_p50_ms': stats['p50_ms'], 'hit_p95_ms': stats['p95_ms']})
+    return results
+
+def _reset_peak_rss():
+    """Resets the process's peak RSS to its current RSS (Linux). Returns False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_kib():
+    # VmHWM is what clear_refs resets; ru_maxrss also carries the parent's peak across exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / 1024 if sys.platform == "darwin" else peak
+
+def _use_fixed_canvas():
+    """Patches the renderer back to the former pipeline's allocations (see module docstring)."""
+    measure_layout = card_renderer.measure_card_layout
+    content_heights = []
+
+    def fixed_layout(*args, **kwargs):
+        layout = measure_layout(*args, **kwargs)
+        content_heights.append(layout['height'])
+        layout['height'] = max(FIXED_CANVAS_HEIGHT, layout['height'])
+        return layout
+
+    def crop_and_round_corners(im, radius):
+        im = im.crop((0, 0, im.width, content_heights[-1]))
+        mask = Image.new('L', im.size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle([(0, 0), im.size], radius=radius, fill=255)
+        im = im.convert("RGBA")
+        output = Image.new('RGBA', im.size, (0, 0, 0, 0))
+        output.paste(im, (0, 0), mask=mask)
+        return output
+
+    card_renderer.measure_card_layout = fixed_layout
+    card_renderer.round_corners = crop_and_round_corners
+
+def canvas_probe(pipeline, lang, pm):
+    """
+    Entry point of the fresh interpreter started by canvas_peak_kib: loads the fonts and
+    icons, resets the peak RSS, renders one card and prints the result as JSON.
+    """
+    if pipeline == 'fixed':
+        _use_fixed_canvas()
+    t = TRANSLATIONS
+    level_text, color, emoji, advice = get_aqi_level(pm, lang, t)
+    date_str = format_reading_time(CARD_TIME, lang, t)
+    for url in card_renderer.FONT_URLS.values():
+        card_renderer.download_asset_bytes(url)
+    for name, sizes in card_renderer.ICON_VARIANT_SIZES.items():
+        for size in sizes:
+            card_renderer.icon_atlas.get(name, size)
+    gc.collect()
+
+    reset = _reset_peak_rss()
+    before = _peak_rss_kib()
+    img = card_renderer.render_report_card(pm, level_text, color, emoji, advice['details'], date_str, lang, t)
+    print(json.dumps({'peak_kib': round(_peak_rss_kib() - before, 1), 'size': list(img.size), 'reset': reset}))
+
+def canvas_peak_kib(pipeline, lang, pm):
+    """Peak RSS growth (KiB) of one render with the 'exact' or 'fixed' canvas pipeline."""
+    code = f"import bench_card; bench_card.canvas_probe({pipeline!r}, {lang!r}, {pm!r})"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+def perceptual_diff(png_a, png_b):
+    """Returns (ok, stats) comparing two PNGs after a light blur, in RGBA space."""
+    a = Image.open(BytesIO(png_a)).convert("RGBA")
+    b = Image.open(BytesIO(png_b)).convert("RGBA")
+    if a.size != b.size:
+        return False, {'size_a': a.size, 'size_b': b.size}
+    diff = ImageChops.difference(a.filter(ImageFilter.GaussianBlur(BLUR_RADIUS)),
+                                 b.filter(ImageFilter.GaussianBlur(BLUR_RADIUS)))
+    mean_diff = max(ImageStat.Stat(diff).mean)
+    # Per-pixel maximum over the channels
+    channels = diff.split()
+    max_channel = channels[0]
+    for channel in channels[1:]:
+        max_channel = ImageChops.lighter(max_channel, channel)
+    changed = max_channel.point(lambda v: 255 if v > PIXEL_DIFF_THRESHOLD else 0)
+    changed_ratio = ImageStat.Stat(changed).mean[0] / 255
+    ok = mean_diff <= MAX_MEAN_DIFF and changed_ratio <= MAX_CHANGED_RATIO
+    return ok, {'mean_diff': round(mean_diff, 4), 'changed_ratio': round(changed_ratio, 6)}
+
+def golden_path(golden_dir, lang, level_no):
+    return os.path.join(golden_dir, f"{lang}_level{level_no}.png")
+
+def asset_pack_stamp():
+    """Version and manifest checksum of the bundled asset pack, or None if none is bundled."""
+    try:
+        with open(os.path.join(ASSET_PACK_DIR, MANIFEST_FILE), "rb") as f:
+            manifest = f.read()
+    except OSError:
+        return None
+    return {'version': json.loads(manifest).get('version'), 'manifest_sha256': sha256_bytes(manifest)}
+
+def golden_pack_problem(golden_dir, stamp):
+    """Why the goldens in golden_dir can't be trusted against the current pack, or None."""
+    if stamp is None:
+        return f"no asset pack in {ASSET_PACK_DIR}: run build_asset_pack.py, then --update-golden"
+    try:
+        with open(os.path.join(golden_dir, GOLDEN_PACK_FILE), encoding="utf-8") as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return f"no {GOLDEN_PACK_FILE} in {golden_dir}: goldens were not recorded against a known pack"
+    if recorded != stamp:
+        return (f"goldens were recorded against asset pack v{recorded.get('version')} "
+                f"({str(recorded.get('manifest_sha256'))[:12]}), the current pack is v{stamp['version']} "
+                f"({stamp['manifest_sha256'][:12]}); re-record them with --update-golden")
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--update-golden", action="store_true", help="overwrite the golden PNGs")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR, help="golden PNG directory (default benchmarks/golden)")
+    parser.add_argument("--out", help="output JSON path (default benchmarks/results/card.json)")
+    args = parser.parse_args()
+
+    pack = get_asset_pack()
+    stamp = asset_pack_stamp()
+    if args.update_golden:
+        if stamp is None:
+            parser.error(f"no asset pack in {ASSET_PACK_DIR}: run build_asset_pack.py first "
+                         "(default-font cards are not meaningful goldens)")
+        pack_problem = None
+    else:
+        pack_problem = golden_pack_problem(args.golden_dir, stamp)
+
+    results = []
+    failures = 0
+    peak_rss_reset = True
+    for lang, level_no, pm, date_str in card_jobs():
+        phase_runs = []
+
+        def run():
+            timings = {}
+            png = render(pm, date_str, lang, timings)
+            phase_runs.append(timings)
+            return png
+
+        stats = measure(run, args.repeat)
+        png = render(pm, date_str, lang)
+        card_w, card_h = Image.open(BytesIO(png)).size
+        phases = {phase: round(statistics.median(r.get(phase, 0.0) for r in phase_runs), 3)
+                  for phase in phase_runs[-1]}
+
+        path = golden_path(args.golden_dir, lang, level_no)
+        if args.update_golden:
+            os.makedirs(args.golden_dir, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(png)
+            golden = {'golden': 'updated'}
+        elif os.path.exists(path):
+            with open(path, "rb") as f:
+                ok, diff_stats = perceptual_diff(png, f.read())
+            failures += not ok
+            golden = {'golden': 'match' if ok else 'DIFF', **diff_stats}
+        else:
+            # No reference means nothing was proven: fail rather than skip the check
+            failures += 1
+            golden = {'golden': 'MISSING'}
+
+        exact, fixed = canvas_peak_kib('exact', lang, pm), canvas_peak_kib('fixed', lang, pm)
+        peak_rss_reset = peak_rss_reset and exact['reset'] and fixed['reset']
+        results.append({
+            'case': f"{lang}_level{level_no}", 'level': AQI_LEVELS[level_no - 1]['level_key'],
+            'lang': lang, 'pm25': pm, 'png_bytes': len(png), 'size': f"{card_w}x{card_h}",
+            'canvas_peak_kib': exact['peak_kib'], 'fixed_canvas_peak_kib': fixed['peak_kib'],
+            **stats, 'phases_ms': phases, **golden,
+        })
+
+    if args.update_golden:
+        with open(os.path.join(args.golden_dir, GOLDEN_PACK_FILE), "w", encoding="utf-8") as f:
+            json.dump(stamp, f, indent=2)
+
+    print_table(results, ['case', 'p50_ms', 'p95_ms', 'size', 'canvas_peak_kib', 'fixed_canvas_peak_kib',
+                          'png_bytes', 'golden'])
+    if not peak_rss_reset:
+        print("WARNING: could not reset the peak RSS; canvas peaks include interpreter startup.")
+    print("\nMedian phase times (ms):")
+    for r in results:
+        print(f"  {r['case']:12s} " + "  ".join(f"{k}={v}" for k, v in r['phases_ms'].items()))
+    encodings = bench_encoders(args.repeat)
+    print("\nEncoders (level %d card):" % ENCODE_LEVEL)
+    print_table(encodings, ['variant', 'lang', 'size', 'mode', 'kib', 'encode_p50_ms', 'encode_p95_ms'])
+
+    caches = bench_card_caches(args.repeat)
+    print("\nCard cache hits:")
+    print_table(caches, ['cache', 'hit_p50_ms', 'hit_p95_ms'])
+
+    path = write_results("card", results, args.out, {
+        'repeat': args.repeat,
+        'peak_rss_reset': peak_rss_reset,
+        'asset_pack_version': pack['version'],
+        'golden_pack_problem': pack_problem,
+        'font_registry': card_renderer.font_registry.stats(),
+        'encoders': encodings,
+        'card_caches': caches,
+    })
+    print(f"\nWrote {path}")
+    if pack_problem:
+        print(f"Golden check failed: {pack_problem}")
+    if failures:
+        print(f"{failures} card(s) differ from or have no golden image in {args.golden_dir} "
+              "(record missing ones with --update-golden and the real asset pack)")
+    if pack_problem or failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
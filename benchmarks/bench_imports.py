@@ -0,0 +1,97 @@
+"""
+Cold-start import profile of the dashboard.
+
+Runs a fresh interpreter with `python -X importtime` for every repeat. It imports the same
+modules app.py imports at the top of the script, after Streamlit, because a woken server
+process has already loaded Streamlit before it runs the script. Reports each module's
+cumulative import time (the app's share of time-to-first-byte after a wake), the largest
+modules they pull in along the way, and whether the section-only dependencies
+(Plotly, Pillow, gspread/google-auth, markdown) were loaded before the first section ran.
+
+Usage:
+    python benchmarks/bench_imports.py [--repeat 7] [--modules data_loader ui_components ...] [--out FILE]
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+from harness import ROOT, percentile, print_table, write_results
+
+PRELOAD = "streamlit"
+
+# Top-level imports of app.py
+APP_MODULES = ["data_loader", "ui_components", "translations", "utils", "instrumentation"]
+
+# Only needed once a particular section runs. Streamlit imports plotly.graph_objects itself
+# (for its chart theme); the others should not be loaded until their section runs.
+DEFERRED_PACKAGES = ["plotly.graph_objects", "PIL.Image", "gspread", "google.oauth2", "markdown"]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def parse_importtime(stderr):
+    """[(depth, module, self_us, cumulative_us)] in the order -X importtime reports them."""
+    entries = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            entries.append((len(m.group(3)) // 2, m.group(4), int(m.group(1)), int(m.group(2))))
+    return entries
+
+def profile_once(modules):
+    """
+    Imports PRELOAD, then 'modules', in a fresh interpreter.
+    Returns ({module: cumulative ms}, {package: cumulative ms}, {deferred package: loaded?}).
+    """
+    code = (f"import sys, json; import {PRELOAD}; import {', '.join(modules)}; "
+            f"print(json.dumps({{m: m in sys.modules for m in {DEFERRED_PACKAGES!r}}}))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    entries = parse_importtime(proc.stderr)
+    # Everything PRELOAD pulled in is reported before its own top-level line
+    start = next(i for i, e in enumerate(entries) if e[0] == 0 and e[1] == PRELOAD) + 1
+    module_ms, package_ms = {}, {}
+    for depth, name, _, cumulative in entries[start:]:
+        if depth == 0:
+            module_ms[name] = cumulative / 1000
+        elif depth == 1 and name not in modules:
+            package_ms[name] = package_ms.get(name, 0) + cumulative / 1000
+    return module_ms, package_ms, json.loads(proc.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--modules", nargs="+", default=APP_MODULES)
+    parser.add_argument("--top", type=int, default=8, help="largest dependencies to list")
+    parser.add_argument("--out", help="output JSON path (default benchmarks/results/imports.json)")
+    args = parser.parse_args()
+
+    module_runs, package_runs, loaded = {}, {}, {}
+    for _ in range(args.repeat):
+        module_ms, package_ms, loaded = profile_once(args.modules)
+        module_ms['total'] = sum(module_ms.values())
+        for name, ms in module_ms.items():
+            module_runs.setdefault(name, []).append(ms)
+        for name, ms in package_ms.items():
+            package_runs.setdefault(name, []).append(ms)
+
+    def row(case, name, runs):
+        runs = sorted(runs)
+        return {'case': case, 'module': name, 'runs': len(runs),
+                'p50_ms': round(percentile(runs, 50), 2), 'min_ms': round(runs[0], 2)}
+
+    results = [row('module', name, runs) for name, runs in module_runs.items()]
+    packages = sorted((row('dependency', name, runs) for name, runs in package_runs.items()),
+                      key=lambda r: r['p50_ms'], reverse=True)
+    results += packages[:args.top]
+
+    print_table(results, ['case', 'module', 'p50_ms', 'min_ms'])
+    print("\nLoaded at startup: " + ", ".join(f"{pkg}={'yes' if hit else 'no'}" for pkg, hit in loaded.items()))
+    path = write_results("imports", results, args.out,
+                         {'repeat': args.repeat, 'preload': PRELOAD, 'modules': args.modules,
+                          'deferred_loaded_at_startup': loaded})
+    print(f"\nWrote {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Data pipeline and dashboard renderer benchmark.
+
+Generates synthetic hourly PM2.5 histories (1, 5 and 20 years by default) and times:
+raw-row parsing (load_data's full sync), a delta merge, the shared aggregate tables and
+every data-driven display_* section. The in-memory size of each parsed snapshot is
+reported as snapshot_kib / kib_per_year; the script exits non-zero if it is not exactly
+SNAPSHOT_SCHEMA or exceeds MAX_SNAPSHOT_KIB_PER_YEAR. Streamlit is replaced by
+benchmarks/st_stub.py, so no browser or network is needed. "cold" cases clear all st caches before each run,
+"warm" cases measure a rerun against the same data snapshot.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--years 1 5 20] [--repeat 7] [--out FILE]
+"""
+import argparse
+import sys
+
+import st_stub
+
+st = st_stub.install()
+
+import numpy as np
+import pandas as pd
+
+from harness import ROOT, measure, print_table, write_results
+
+sys.path.insert(0, ROOT)
+
+import aggregates
+import data_loader
+import ui_components
+from translations import TRANSLATIONS
+
+# Expected in-memory layout of a parsed snapshot (see data_loader.SNAPSHOT_DTYPES).
+# One year of hourly readings is ~103 KiB in it (8 + 4 bytes per row).
+SNAPSHOT_SCHEMA = {'Datetime': 'datetime64[ns]', 'PM2.5': 'float32'}
+MAX_SNAPSHOT_KIB_PER_YEAR = 110
+
+def synthetic_rows(years, seed=0):
+    """Raw sheet rows (strings, as gspread returns them) for an hourly history ending now."""
+    end = pd.Timestamp.now().floor('h')
+    index = pd.date_range(end - pd.DateOffset(years=years), end, freq='h')
+    rng = np.random.default_rng(seed)
+    # Seasonal baseline (haze peaks around March) plus noise
+    season = 30 + 25 * np.cos((index.dayofyear.to_numpy() - 75) / 365 * 2 * np.pi)
+    pm = np.clip(season + rng.gamma(2, 6, len(index)) - 10, 1, None).round(1)
+    stamps = index.strftime('%Y-%m-%d %H:%M:%S')
+    return [[s, f"{v:.1f}", s[:10], s[11:]] for s, v in zip(stamps, pm)]
+
+def check_frame(df, years, label):
+    """Problems with an in-memory frame's layout, as a list of messages (empty if none)."""
+    problems = []
+    if list(df.columns) != list(SNAPSHOT_SCHEMA):
+        problems.append(f"{label}: columns {list(df.columns)} != {list(SNAPSHOT_SCHEMA)}")
+    for column, dtype in SNAPSHOT_SCHEMA.items():
+        if column in df and str(df[column].dtype) != dtype:
+            problems.append(f"{label}: {column} is {df[column].dtype}, expected {dtype}")
+    kib_per_year = df.memory_usage(deep=True).sum() / 1024 / years
+    if kib_per_year > MAX_SNAPSHOT_KIB_PER_YEAR:
+        problems.append(f"{label}: {kib_per_year:.1f} KiB/year > {MAX_SNAPSHOT_KIB_PER_YEAR}")
+    return problems
+
+def bench_history(years, repeat, lang):
+    rows = synthetic_rows(years)
+    parsed = data_loader._parse_rows(rows)
+    snapshot = data_loader.Snapshot(parsed, 1)
+    t = TRANSLATIONS
+    n_rows = len(snapshot)
+    head, tail = rows[:-24], rows[-24:]
+    df_head = data_loader._parse_rows(head)
+
+    cases = [
+        ('parse_rows', lambda: data_loader._parse_rows(rows), None),
+        ('delta_merge_24h', lambda: data_loader._merge_rows(df_head, data_loader._parse_rows(tail)), None),
+        ('aggregates', lambda: aggregates._compute_aggregates(snapshot.df), None),
+    ]
+    sections = [
+        ('display_24hr_chart', lambda: ui_components.display_24hr_chart(snapshot, lang, t)),
+        ('display_monthly_calendar', lambda: ui_components.display_monthly_calendar(snapshot, lang, t)),
+        ('display_historical_data', lambda: ui_components.display_historical_data(snapshot, lang, t)),
+        ('display_health_impact', lambda: ui_components.display_health_impact(snapshot, lang, t)),
+    ]
+    for name, func in sections:
+        cases.append((f"{name}:cold", func, st_stub.clear_caches))
+        cases.append((f"{name}:warm", func, None))
+
+    snapshot_bytes = int(snapshot.df.memory_usage(deep=True).sum())
+    # The parsed frame is what the local store persists; Snapshot re-casts its columns
+    problems = check_frame(parsed, years, 'parse_rows') + check_frame(snapshot.df, years, 'snapshot')
+    results = [{
+        'case': 'snapshot_memory', 'years': years, 'rows': n_rows, 'lang': lang,
+        'snapshot_kib': round(snapshot_bytes / 1024, 1),
+        'kib_per_year': round(snapshot_bytes / 1024 / years, 1),
+        'schema': 'FAIL' if problems else 'ok', 'problems': problems,
+    }]
+    for name, func, setup in cases:
+        stats = measure(func, repeat, setup=setup)
+        results.append({'case': name, 'years': years, 'rows': n_rows, 'lang': lang, **stats})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--lang", choices=["th", "en"], default="th")
+    parser.add_argument("--out", help="output JSON path (default benchmarks/results/pipeline.json)")
+    args = parser.parse_args()
+
+    results = []
+    for years in args.years:
+        results.extend(bench_history(years, args.repeat, args.lang))
+
+    print_table(results, ['case', 'years', 'rows', 'p50_ms', 'p95_ms', 'peak_mem_kib', 'kib_per_year', 'schema'])
+    path = write_results("pipeline", results, args.out, {'repeat': args.repeat, 'years': args.years})
+    print(f"\nWrote {path}")
+
+    failures = [r for r in results if r.get('schema') == 'FAIL']
+    for r in failures:
+        print(f"Snapshot check failed for {r['years']} year(s): {'; '.join(r['problems'])}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Shared timing/memory helpers and JSON result writer for the benchmark scripts."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def measure(func, repeat, setup=None, warmup=1):
+    """
+    Times func() 'repeat' times (after 'warmup' untimed calls) and then runs it once more
+    under tracemalloc for the peak allocation. setup(), if given, runs before every call
+    and is not timed. Returns a dict with per-run stats in milliseconds / KiB.
+    """
+    for _ in range(warmup):
+        if setup: setup()
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    if setup: setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'min_ms': round(timings[0], 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'peak_mem_kib': round(peak / 1024, 1),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(name, results, out=None, extra_meta=None):
+    """Writes results as JSON (default benchmarks/results/<name>.json) and returns the path."""
+    out = out or os.path.join(RESULTS_DIR, f"{name}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    meta = {
+        'benchmark': name,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+    }
+    meta.update(extra_meta or {})
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, ensure_ascii=False)
+    return out
+
+def print_table(results, columns):
+    """Prints results as a fixed-width table for a quick look in the terminal."""
+    widths = [max(len(col), *(len(str(r.get(col, ''))) for r in results)) for col in columns]
+    print("  ".join(col.ljust(w) for col, w in zip(columns, widths)))
+    for r in results:
+        print("  ".join(str(r.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
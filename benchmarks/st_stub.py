@@ -0,0 +1,172 @@
+"""
+Minimal stand-in for the `streamlit` module so dashboard code can be driven headless.
+
+install() registers the stub as `streamlit` (and `streamlit.components.v1`) in
+sys.modules; it must run before any dashboard module is imported. Output elements are
+no-ops that only count calls, widgets return their default value, fragments run as
+plain functions, cache_data / cache_resource memoize like Streamlit (arguments starting
+with '_' are not part of the key; cache_data returns an unpickled copy on every hit,
+cache_resource the same object) and clear_caches() empties every cache so a run can be
+measured cold.
+"""
+import datetime
+import functools
+import pickle
+import sys
+import types
+
+calls = {}
+_caches = []
+
+def _record(name):
+    calls[name] = calls.get(name, 0) + 1
+
+def _memoize(func, copy=False):
+    cache = {}
+    _caches.append(cache)
+    code = func.__code__
+    arg_names = code.co_varnames[:code.co_argcount]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key_args = tuple(a for name, a in zip(arg_names, args) if not name.startswith('_'))
+        key_kwargs = tuple(sorted((k, v) for k, v in kwargs.items() if not k.startswith('_')))
+        try:
+            key = (key_args, key_kwargs)
+            if key in cache:
+                return pickle.loads(cache[key]) if copy else cache[key]
+        except TypeError:
+            # Unhashable argument: behave like a cache miss every time
+            return func(*args, **kwargs)
+        result = func(*args, **kwargs)
+        # Like st.cache_data, keep a pickled copy and pay the round trip on every hit
+        cache[key] = pickle.dumps(result) if copy else result
+        return result
+
+    wrapper.clear = cache.clear
+    return wrapper
+
+def _cache_data(func=None, **_options):
+    if func is None:
+        return functools.partial(_memoize, copy=True)
+    return _memoize(func, copy=True)
+
+def _cache_resource(func=None, **_options):
+    if func is None:
+        return _memoize
+    return _memoize(func)
+
+def _fragment(func=None, **_options):
+    # Fragments only matter for partial reruns; headless calls run the function directly
+    if func is None:
+        return lambda f: f
+    return func
+
+def clear_caches():
+    for cache in _caches:
+        cache.clear()
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+class StopException(Exception):
+    pass
+
+class RerunException(Exception):
+    pass
+
+def _noop(name):
+    def element(*args, **kwargs):
+        _record(name)
+    return element
+
+def _selectbox(label, options, index=0, format_func=str, **kwargs):
+    _record('selectbox')
+    options = list(options)
+    return options[index] if options else None
+
+def _date_input(label, value=None, **kwargs):
+    _record('date_input')
+    # Like Streamlit, datetimes/Timestamps come back as plain dates
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+def _button(*args, **kwargs):
+    _record('button')
+    return False
+
+class _Container:
+    """Stands in for st.columns()/st.expander() results: usable as a context manager."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(_module, name)
+
+def _columns(spec, **kwargs):
+    _record('columns')
+    count = spec if isinstance(spec, int) else len(spec)
+    return [_Container() for _ in range(count)]
+
+def _container(*args, **kwargs):
+    _record('container')
+    return _Container()
+
+def _stop():
+    raise StopException()
+
+def _rerun(*args, **kwargs):
+    raise RerunException()
+
+_OUTPUT_ELEMENTS = [
+    'markdown', 'write', 'title', 'header', 'subheader', 'caption', 'divider', 'metric',
+    'plotly_chart', 'info', 'warning', 'error', 'success', 'toast', 'download_button',
+    'set_page_config', 'json', 'code', 'dataframe',
+]
+
+def _build():
+    module = types.ModuleType('streamlit')
+    module.__stub__ = True
+    for name in _OUTPUT_ELEMENTS:
+        setattr(module, name, _noop(name))
+    module.selectbox = _selectbox
+    module.date_input = _date_input
+    module.button = _button
+    module.columns = _columns
+    module.container = _container
+    module.expander = _container
+    module.stop = _stop
+    module.rerun = _rerun
+    module.cache_data = _cache_data
+    module.cache_resource = _cache_resource
+    module.fragment = _fragment
+    module.session_state = SessionState()
+    module.secrets = {}
+    module.query_params = {}
+    return module
+
+_module = _build()
+
+def install():
+    """Registers the stub as `streamlit` and returns it."""
+    components = types.ModuleType('streamlit.components')
+    components_v1 = types.ModuleType('streamlit.components.v1')
+    components_v1.html = _noop('components_html')
+    components.v1 = components_v1
+    _module.components = components
+    sys.modules['streamlit'] = _module
+    sys.modules['streamlit.components'] = components
+    sys.modules['streamlit.components.v1'] = components_v1
+    return _module
@@ -0,0 +1,74 @@
+"""
+Downloads the report-card fonts and icons into the local asset pack (assets/)
+and writes manifest.json with SHA-256 checksums.
+
+Usage:
+    python build_asset_pack.py [--version N] [--out DIR]
+
+Run it whenever the upstream assets should be refreshed, then commit the result.
+"""
+import argparse
+import json
+import os
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+from asset_pack import ASSET_PACK_DIR, MANIFEST_FILE, sha256_bytes
+from card_renderer import FONT_URLS, ICON_URLS, ICON_VARIANT_SIZES, pack_location, resize_icon
+
+def _download(url):
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+def _write(out_dir, rel_path, data):
+    path = os.path.join(out_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return {'file': rel_path, 'sha256': sha256_bytes(data)}
+
+def build(out_dir, version):
+    assets = {}
+
+    for name, url in FONT_URLS.items():
+        key, rel_path = pack_location(url)
+        entry = _write(out_dir, rel_path, _download(url))
+        entry['url'] = url
+        assets[key] = entry
+        print(f"font  {name:10s} {entry['file']}")
+
+    for name, url in ICON_URLS.items():
+        data = _download(url)
+        key, rel_path = pack_location(url)
+        entry = _write(out_dir, rel_path, data)
+        entry['url'] = url
+        entry['variants'] = {}
+        img = Image.open(BytesIO(data)).convert("RGBA")
+        for size in ICON_VARIANT_SIZES.get(name, ()):
+            buf = BytesIO()
+            # Same resize the card would do at render time, so variants are pixel-identical
+            variant = resize_icon(name, img, size)
+            variant.save(buf, format="PNG")
+            variant_entry = _write(out_dir, f"icons/{name}_{size}.png", buf.getvalue())
+            variant_entry['width'], variant_entry['height'] = variant.size
+            entry['variants'][str(size)] = variant_entry
+        assets[key] = entry
+        print(f"icon  {name:10s} {entry['file']} (+{len(entry['variants'])} sizes)")
+
+    manifest = {'version': version, 'assets': assets}
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Wrote asset pack v{version} to {out_dir}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", type=int, default=1, help="pack version recorded in the manifest")
+    parser.add_argument("--out", default=ASSET_PACK_DIR, help="output directory (default: assets/)")
+    args = parser.parse_args()
+    build(args.out, args.version)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,721 @@
+"""
+Report card renderer: pure Pillow, no Streamlit.
+Renders the shareable PM2.5 card (render_report_card / generate_report_card) and serves
+encoded cards through CardRenderer with a pluggable card cache (MemoryCardCache,
+DiskCardCache, or any object with get/put). card_generator.py is the thin Streamlit
+adapter the dashboard uses.
+"""
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageOps
+import requests
+from io import BytesIO
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+import os
+from asset_pack import add_asset, bundled_pack_present, get_asset_bytes, get_asset_pack, get_variant_bytes
+from utils import AQI_LEVELS, aqi_level_index
+from text_layout import thai_text_layout, wrap_text
+
+# --- 1. Assets & Configurations ---
+ICON_URLS = {
+    'mask': "https://img.icons8.com/ios-filled/100/ffffff/protection-mask.png",
+    'activity': "https://img.icons8.com/ios-filled/100/ffffff/running.png",
+    'indoors': "https://img.icons8.com/ios-filled/100/ffffff/home.png",
+    'user': "https://img.icons8.com/ios-filled/100/ffffff/user.png", 
+    'heart': "https://img.icons8.com/ios-filled/100/ffffff/like.png",
+    'logo': "https://www.cmuccdc.org/template/image/logo_ccdc.png"
+}
+
+# Fonts - Using Sarabun (Proven Safe & Stable)
+FONT_FAMILY = "Sarabun"
+FONT_URLS = {
+    'bold': "https://github.com/google/fonts/raw/main/ofl/sarabun/Sarabun-Bold.ttf",
+    'medium': "https://github.com/google/fonts/raw/main/ofl/sarabun/Sarabun-Medium.ttf",
+    'regular': "https://github.com/google/fonts/raw/main/ofl/sarabun/Sarabun-Regular.ttf",
+}
+
+# Pixel heights each icon is drawn at on the card (pre-sized in the asset pack and icon atlas)
+ICON_VARIANT_SIZES = {
+    'mask': (75,),
+    'activity': (75,),
+    'indoors': (75,),
+    'user': (55,),
+    'heart': (55,),
+    'logo': (220,),
+}
+
+# Download assets missing from the local pack (into ASSET_CACHE_DIR). Off by default once a
+# built pack is bundled, so it is the only source; on while there is none to fall back on.
+ASSET_NETWORK_FALLBACK = os.environ.get(
+    "PM25_ASSET_NETWORK_FALLBACK", "0" if bundled_pack_present() else "1") != "0"
+
+CANVAS_WIDTH = 1200 # The height is measured from the content before drawing
+
+# Rendered cards kept by MemoryCardCache (LRU); the latest reading changes at most hourly
+CARD_CACHE_SIZE = 32
+
+# Part of every card cache key: bump when the card's look changes so DiskCardCache
+# directories written by an older renderer are not served
+RENDERER_VERSION = 2
+
+# Output encoders: format -> (Pillow format, default save options, MIME type)
+CARD_FORMATS = {
+    'png': ('PNG', {'compress_level': 6}, "image/png"),
+    'webp': ('WEBP', {'quality': 85, 'method': 4}, "image/webp"),
+    'jpeg': ('JPEG', {'quality': 88, 'optimize': True, 'progressive': True}, "image/jpeg"),
+}
+
+# Downscaled widths offered for social sharing (LINE, Facebook, ...)
+SHARE_WIDTHS = (600, 1080)
+
+# Background the transparent corners are flattened onto when alpha is dropped
+FLATTEN_BACKGROUND = (255, 255, 255)
+
+# --- Cache & Utils ---
+_asset_bytes = {}
+_asset_bytes_lock = threading.Lock()
+
+def pack_location(url):
+    """(manifest key, file path) build_asset_pack.py uses for an asset URL, or None."""
+    for name, font_url in FONT_URLS.items():
+        if font_url == url:
+            return f"font_{name}", f"fonts/{os.path.basename(url)}"
+    for name, icon_url in ICON_URLS.items():
+        if icon_url == url:
+            return f"icon_{name}", f"icons/{name}.png"
+    return None
+
+def _valid_asset(url, data):
+    """True if downloaded bytes parse as the font or image they should be."""
+    try:
+        if url in FONT_URLS.values():
+            ImageFont.truetype(BytesIO(data), 12)
+        else:
+            Image.open(BytesIO(data)).verify()
+        return True
+    except Exception:
+        return False
+
+def download_asset_bytes(url):
+    """
+    Returns asset bytes from the local asset pack, falling back to a download if allowed.
+    Downloads that parse as a font or image are saved to the download cache (add_asset),
+    so later processes on the same host read them from disk.
+    Successful results are kept for the life of the process.
+    """
+    with _asset_bytes_lock:
+        if url in _asset_bytes:
+            return _asset_bytes[url]
+    data = get_asset_bytes(url)
+    if data is None:
+        if not ASSET_NETWORK_FALLBACK:
+            print(f"Asset not in local pack and network fallback disabled: {url}")
+            return None
+        try:
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            data = response.content
+        except Exception as e:
+            print(f"Download failed for {url}: {e}")
+            return None
+        if not _valid_asset(url, data):
+            print(f"Downloaded asset is not a valid font or image: {url}")
+            return None
+        location = pack_location(url)
+        if location:
+            key, rel_path = location
+            add_asset(key, url, rel_path, data)
+    with _asset_bytes_lock:
+        _asset_bytes[url] = data
+    return data
+
+def get_font(url, size):
+    font_bytes = download_asset_bytes(url)
+    if font_bytes:
+        try:
+            return ImageFont.truetype(BytesIO(font_bytes), size)
+        except Exception as e:
+            print(f"Could not load font {url}: {e}")
+    print(f"Falling back to the default font for {url}; run build_asset_pack.py to bundle it")
+    return ImageFont.load_default()
+
+class FontRegistry:
+    """
+    Process-wide cache of parsed FreeTypeFont objects keyed by (family, weight, size),
+    so the TTF bytes are parsed once per size instead of on every card render.
+    Safe to share between threads: a miss loads the font (possibly downloading it) under a
+    per-key lock only, so lookups of other keys are never held up by it.
+    """
+
+    def __init__(self, font_urls):
+        self.font_urls = font_urls
+        self.hits = 0
+        self.misses = 0
+        self._fonts = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, weight, size, family=FONT_FAMILY):
+        key = (family, weight, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self.hits += 1
+                return font
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded this key while we waited
+            with self._lock:
+                font = self._fonts.get(key)
+            if font is None:
+                font = get_font(self.font_urls[(family, weight)], size)
+                with self._lock:
+                    self._fonts[key] = font
+            return font
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'fonts': len(self._fonts)}
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self._key_locks.clear()
+            self.hits = self.misses = 0
+
+font_registry = FontRegistry({(FONT_FAMILY, weight): url for weight, url in FONT_URLS.items()})
+
+def get_image_from_url(url):
+    img_bytes = download_asset_bytes(url)
+    if img_bytes:
+        try:
+            img = Image.open(BytesIO(img_bytes))
+            return img.convert("RGBA")
+        except Exception:
+            return None
+    return None
+
+def resize_icon(name, img, size):
+    """Resizes an icon to its on-card size: the logo keeps its aspect ratio, other icons are square."""
+    if name == 'logo':
+        width = int(size * (img.width / img.height))
+        return img.resize((width, size), Image.Resampling.LANCZOS)
+    return img.resize((size, size), Image.Resampling.LANCZOS)
+
+class IconAtlas:
+    """
+    Every ICON_URLS entry decoded to RGBA at each size in ICON_VARIANT_SIZES, built once
+    per process. get() is a dict lookup returning a ready-to-paste image (or None if the
+    icon could not be loaded), so rendering does no PNG decoding or resampling.
+    Returned images are shared: paste them, never draw on them.
+    """
+
+    def __init__(self, icon_urls, sizes):
+        self.icon_urls = icon_urls
+        self.sizes = sizes
+        self._icons = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        icons = {}
+        for name, url in self.icon_urls.items():
+            source = None
+            for size in self.sizes.get(name, ()):
+                packed = get_variant_bytes(url, size)
+                if packed is not None:
+                    icons[(name, size)] = Image.open(BytesIO(packed)).convert("RGBA")
+                    continue
+                if source is None:
+                    source = get_image_from_url(url)
+                    if source is None:
+                        break
+                icons[(name, size)] = resize_icon(name, source, size)
+        return icons
+
+    def get(self, name, size):
+        if self._icons is None:
+            with self._lock:
+                if self._icons is None:
+                    self._icons = self._build()
+        return self._icons.get((name, size))
+
+icon_atlas = IconAtlas(ICON_URLS, ICON_VARIANT_SIZES)
+
+def get_theme_color(pm):
+    # Same breakpoints and colors as the dashboard (utils.AQI_LEVELS)
+    return AQI_LEVELS[aqi_level_index(pm)]['color']
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def has_thai_characters(text):
+    """Checks if the text contains Thai characters."""
+    return bool(re.search(r'[\u0E00-\u0E7F]', text))
+
+def draw_thai_text(draw, text, font, x, y, color, anchor='lt'):
+    """
+    Custom renderer for Thai text to fix floating vowel/tone overlap issues.
+    Only used when Thai characters are detected.
+    """
+    if not text: return
+
+    # 1. Base text (problematic tones stripped) and tone offsets, cached per (text, font)
+    base_text, tones = thai_text_layout(text, font)
+
+    # 2. Calculate Base Position
+    if anchor == 'mm':
+        bbox = draw.textbbox((x, y), base_text, font=font, anchor='mm')
+        start_x, start_y = bbox[0], bbox[1]
+    else: # 'lt'
+        start_x, start_y = x, y
+
+    # 3. Draw Base Text (Tones stripped)
+    draw.text((start_x, start_y), base_text, font=font, fill=color)
+
+    # 4. Manual Tone Surgery (Draw stripped tones in correct position)
+    for char, prefix_w, center_offset, shift_amount in tones:
+        # X: Start + Prefix + Center over vowel; Y: lifted above the line top
+        tone_x = start_x + prefix_w + center_offset
+        tone_y = start_y - shift_amount
+        draw.text((tone_x, tone_y), char, font=font, fill=color)
+
+def round_corners(im, radius):
+    """Makes everything outside a rounded rectangle transparent, in place for RGBA images."""
+    if im.mode != 'RGBA':
+        im = im.convert("RGBA")
+    outside = Image.new('L', im.size, 255)
+    ImageDraw.Draw(outside).rounded_rectangle([(0, 0), im.size], radius=radius, fill=0)
+    im.paste((0, 0, 0, 0), (0, 0) + im.size, mask=outside)
+    return im
+
+class RenderTimer:
+    """
+    Lap timer for generate_report_card: mark(phase) adds the time since the previous mark
+    to timings[phase] (milliseconds). Does nothing when no timings dict is given.
+    """
+
+    def __init__(self, timings=None):
+        self.timings = timings
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+# --- Drawing Helpers ---
+def draw_text_centered(draw, text, font, x, y, color):
+    # INTELLIGENT SWITCH: 
+    # Use custom Thai renderer ONLY if Thai characters are present.
+    # Otherwise (Numbers, English) use standard PIL renderer to avoid layout breakage.
+    if has_thai_characters(text):
+        draw_thai_text(draw, text, font, x, y, color, anchor='mm')
+    else:
+        draw.text((x, y), text, font=font, fill=color, anchor="mm")
+
+def draw_text_left(draw, text, font, x, y, color):
+    if has_thai_characters(text):
+        draw_thai_text(draw, text, font, x, y, color, anchor='lt')
+    else:
+        draw.text((x, y), text, font=font, fill=color, anchor="lt")
+
+# --- MAIN GENERATOR ---
+# Fixed block metrics shared by the layout and draw passes
+SHEET_Y = 920
+MARGIN_X = 70
+ADVICE_CARD_H = 240
+ADVICE_ICON_SIZE = 100
+ACTION_COL_H = 360
+ACTION_GRID_GAP = 18
+FOOTER_GAP = 80
+
+def measure_card_layout(latest_pm25, advice_details, date_str, lang, t, fonts, width=CANVAS_WIDTH):
+    """
+    Layout pass of the report card: wraps every text block and places every section
+    without touching a pixel. Returns a dict of block positions/lines plus the exact
+    canvas 'height', so the draw pass can allocate the final image size up front.
+    """
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    card_width = width - (MARGIN_X * 2)
+    layout = {'width': width}
+
+    # --- DATE PILL ---
+    date_bbox = measure.textbbox((0, 0), date_str, font=fonts['pill'])
+    date_w = date_bbox[2] - date_bbox[0] + 80
+    date_h = date_bbox[3] - date_bbox[1] + 30
+    layout['date_pill'] = (width - date_w - 60, 110, date_w, date_h)
+
+    # --- ADVICE CARDS ---
+    gen_desc = t[lang]['advice']['advice_1']['summary']
+    if latest_pm25 > 25: gen_desc = t[lang]['advice']['advice_2']['summary']
+    if latest_pm25 > 37.5: gen_desc = t[lang]['advice']['advice_3']['summary']
+    if latest_pm25 > 75: gen_desc = t[lang]['advice']['advice_4']['summary']
+
+    text_w = card_width - (40 + ADVICE_ICON_SIZE + 40) - 40
+    y_pos = SHEET_Y + 80
+    layout['advice_cards'] = []
+    for title, desc, icon_key in ((t[lang]['general_public'], gen_desc, 'user'),
+                                  (t[lang]['risk_group'], advice_details['risk_group'], 'heart')):
+        desc_lines = wrap_text(desc, fonts['body'], text_w, measure)[:3] # Limit to 3 lines max
+        layout['advice_cards'].append((y_pos, title, desc_lines, icon_key))
+        y_pos += ADVICE_CARD_H + 40
+
+    # --- ACTION GRID ---
+    layout['actions_header_y'] = y_pos + 40
+    grid_y = layout['actions_header_y'] + 60
+    col_w = (width - (MARGIN_X * 2) - (ACTION_GRID_GAP * 2)) / 3
+
+    # --- Custom Logic: Override Indoors text based on PM2.5 Level ---
+    indoors_val = advice_details['indoors']
+    if 25 < latest_pm25 <= 37.5:
+        indoors_val = "เลี่ยงเปิดหน้าต่าง / เปิดเครื่องฟอก"
+    elif latest_pm25 > 37.5:
+        indoors_val = "ปิดบ้านสนิท / เปิดเครื่องฟอก"
+
+    actions = [
+        (t[lang]['advice_cat_mask'], advice_details['mask'], 'mask'),
+        (t[lang]['advice_cat_activity'], advice_details['activity'], 'activity'),
+        (t[lang]['advice_cat_indoors'], indoors_val, 'indoors'),
+    ]
+    layout['grid'] = (grid_y, col_w, ACTION_COL_H)
+    layout['actions'] = [
+        (label, wrap_text(val, fonts['action_val'], col_w - 20, measure)[:4], icon)
+        for label, val, icon in actions
+    ]
+
+    # --- FOOTER ---
+    layout['footer_y'] = grid_y + ACTION_COL_H + FOOTER_GAP
+    layout['height'] = int(layout['footer_y'] + 80) # Padding below footer
+    return layout
+
+def render_report_card(latest_pm25, level, color_hex, emoji, advice_details, date_str, lang, t, timer=None):
+    """
+    Renders the shareable PM2.5 report card and returns it as an RGBA image.
+    A layout pass measures every block first, so the card is drawn once onto a canvas
+    of its exact final size.
+    """
+    timer = timer or RenderTimer()
+    theme_rgb = hex_to_rgb(get_theme_color(latest_pm25))
+
+    # Fonts - parsed once per process by the font registry
+    f_huge = font_registry.get('bold', 200)
+    f_header = font_registry.get('bold', 90)
+    f_title = font_registry.get('bold', 44)
+    f_subtitle = font_registry.get('medium', 38)
+    f_body = font_registry.get('regular', 32)
+    f_small = font_registry.get('regular', 28)
+    f_pill = font_registry.get('medium', 30)
+    f_unit = font_registry.get('medium', 40)
+    f_action_val = font_registry.get('bold', 30)
+    timer.mark('fonts')
+
+    layout = measure_card_layout(latest_pm25, advice_details, date_str, lang, t,
+                                 {'pill': f_pill, 'body': f_body, 'action_val': f_action_val})
+    timer.mark('text_layout')
+
+    # Base Image - allocated once at the measured size
+    width, height = layout['width'], layout['height']
+    img = Image.new('RGBA', (width, height), get_theme_color(latest_pm25))
+    draw = ImageDraw.Draw(img)
+    timer.mark('canvas')
+
+    # ==========================================
+    # 1. HEADER SECTION (Logo & Date)
+    # ==========================================
+    
+    # --- LOGO ---
+    logo_img = icon_atlas.get('logo', 220)
+    if logo_img:
+        logo_x = 50
+        logo_y = 40
+        img.paste(logo_img, (logo_x, logo_y), logo_img)
+    timer.mark('icons')
+
+    # --- DATE PILL ---
+    date_x, date_y, date_w, date_h = layout['date_pill']
+    
+    date_bg = Image.new('RGBA', (int(date_w), int(date_h)), (0,0,0,0))
+    date_draw = ImageDraw.Draw(date_bg)
+    # Changed fill to more opaque white (220) to ensure black text contrast against dark themes
+    date_draw.rounded_rectangle([0, 0, date_w, date_h], radius=30, fill=(255, 255, 255, 220))
+    img.paste(date_bg, (int(date_x), int(date_y)), date_bg)
+    
+    # Changed text color to Black (#000000)
+    draw_text_centered(draw, date_str, f_pill, date_x + date_w//2, date_y + date_h//2 - 4, "#000000")
+
+    # ==========================================
+    # 2. GAUGE SECTION
+    # ==========================================
+    gauge_cy = 550
+    gauge_r = 230
+    draw.ellipse([width//2 - gauge_r, gauge_cy - gauge_r, width//2 + gauge_r, gauge_cy + gauge_r], fill="white")
+    draw.arc([width//2 - gauge_r, gauge_cy - gauge_r, width//2 + gauge_r, gauge_cy + gauge_r], 
+             start=0, end=360, fill="#e2e8f0", width=25)
+    percent = min((latest_pm25 / 120) * 360, 360)
+    draw.arc([width//2 - gauge_r, gauge_cy - gauge_r, width//2 + gauge_r, gauge_cy + gauge_r], 
+             start=-90, end=-90+percent, fill=theme_rgb, width=25)
+    
+    # Numbers and English units go through standard PIL drawing (via the check in draw_text_centered)
+    draw_text_centered(draw, f"{latest_pm25:.0f}", f_huge, width//2, gauge_cy - 20, theme_rgb)
+    draw_text_centered(draw, "µg/m³", f_unit, width//2, gauge_cy + 100, theme_rgb)
+    
+    # Thai level text goes through custom renderer
+    draw_text_centered(draw, level, f_header, width//2, gauge_cy + 290, "white")
+
+    # ==========================================
+    # 3. WHITE SHEET (Body)
+    # ==========================================
+    draw.rounded_rectangle([0, SHEET_Y, width, height], radius=80, fill="white", corners=(True, True, False, False))
+
+    margin_x = MARGIN_X
+    card_width = width - (margin_x * 2)
+
+    def draw_advice_card(y_pos, title, desc_lines, icon_key):
+        card_h = ADVICE_CARD_H
+        draw.rounded_rectangle([margin_x, y_pos, margin_x + card_width, y_pos + card_h], radius=40, fill="#f8fafc")
+        
+        icon_size = ADVICE_ICON_SIZE
+        ic_x = margin_x + 40
+        ic_y = y_pos + (card_h - icon_size) // 2
+        draw.ellipse([ic_x, ic_y, ic_x+icon_size, ic_y+icon_size], fill=theme_rgb)
+        
+        timer.mark('draw')
+        icon_img = icon_atlas.get(icon_key, 55)
+        if icon_img:
+            img.paste(icon_img, (ic_x+22, ic_y+22), icon_img)
+        timer.mark('icons')
+            
+        text_x = ic_x + icon_size + 40
+        
+        # --- VERTICAL CENTERING LOGIC ---
+        # Title height approx (font size 44) + gap + Body height (lines * line height)
+        title_h = 50 
+        line_h = 45
+        gap = 10
+        
+        total_text_h = title_h + gap + (len(desc_lines) * line_h)
+        
+        # Start Y = Center of card - (Total Height / 2)
+        text_start_y = y_pos + (card_h - total_text_h) / 2
+        
+        # Draw Title
+        draw_text_left(draw, title, f_title, text_x, text_start_y, "#1e293b")
+        
+        # Draw Description Lines
+        current_y = text_start_y + title_h + gap
+        for line in desc_lines:
+            draw_text_left(draw, line, f_body, text_x, current_y, "#64748b")
+            current_y += line_h
+
+    for y_pos, title, desc_lines, icon_key in layout['advice_cards']:
+        draw_advice_card(y_pos, title, desc_lines, icon_key)
+
+    # ==========================================
+    # 4. ACTION GRID (Bottom)
+    # ==========================================
+    # Changed color to #000000 (Black)
+    draw_text_left(draw, t[lang]['advice_header'], f_subtitle, margin_x + 10, layout['actions_header_y'], "#000000")
+    
+    grid_y, col_w, col_h = layout['grid']
+    tint_color = theme_rgb + (20,)
+    
+    for i, (label, v_lines, icon_key) in enumerate(layout['actions']):
+        bx = margin_x + i * (col_w + ACTION_GRID_GAP)
+        by = grid_y
+        
+        tint_layer = Image.new('RGBA', (int(col_w), int(col_h)), (0,0,0,0))
+        tint_draw = ImageDraw.Draw(tint_layer)
+        tint_draw.rounded_rectangle([0, 0, col_w, col_h], radius=35, fill=tint_color)
+        img.paste(tint_layer, (int(bx), int(by)), tint_layer)
+        
+        cx = bx + col_w / 2
+        
+        # --- NEW LAYOUT: Fixed Top Alignment ---
+        # Instead of centering everything vertically, we lock the top position
+        # so icons and titles always line up perfectly.
+        
+        padding_top = 40 
+        
+        ic_size = 110 
+        gap_icon_label = 25 
+        h_label = 30 
+        gap_label_val = 15 
+        line_height = 36 
+        
+        # 1. Icon Position (Fixed Top)
+        icon_cy = by + padding_top + (ic_size / 2)
+        draw.ellipse([cx - ic_size/2, icon_cy - ic_size/2, cx + ic_size/2, icon_cy + ic_size/2], fill=theme_rgb)
+        
+        timer.mark('draw')
+        act_icon = icon_atlas.get(icon_key, 75)
+        if act_icon:
+            icon_img_y = icon_cy - (75 / 2)
+            img.paste(act_icon, (int(cx - 37), int(icon_img_y)), act_icon)
+        timer.mark('icons')
+            
+        # 2. Label Position (Fixed distance from Icon)
+        label_cy = by + padding_top + ic_size + gap_icon_label + (h_label / 2)
+        draw_text_centered(draw, label, f_pill, cx, label_cy, "#64748b")
+        
+        # 3. Value Position (Fixed distance from Label, flowing down)
+        val_start_y = by + padding_top + ic_size + gap_icon_label + h_label + gap_label_val
+        for k, vl in enumerate(v_lines):
+            line_cy = val_start_y + (k * line_height) + (line_height / 2)
+            draw_text_centered(draw, vl, f_action_val, cx, line_cy, theme_rgb)
+
+    # ==========================================
+    # 5. FOOTER
+    # ==========================================
+    # Changed color to #000000 (Black)
+    draw_text_centered(draw, t[lang]['report_card_footer'], f_small, width//2, layout['footer_y'], "#000000")
+    timer.mark('draw')
+
+    final_img = round_corners(img, 60)
+    timer.mark('corners')
+    return final_img
+
+def encode_card(img, fmt='png', width=None, flatten=None, **options):
+    """
+    Encodes a rendered card and returns the bytes.
+    fmt: 'png', 'webp' or 'jpeg'; options override the CARD_FORMATS save defaults
+    (e.g. compress_level for PNG, quality for WebP/JPEG).
+    width: downscale to this width (aspect kept) for sharing, e.g. one of SHARE_WIDTHS.
+    flatten: composite the transparent corners onto FLATTEN_BACKGROUND and drop alpha;
+    defaults to True for JPEG (no alpha support) and False otherwise.
+    """
+    pil_format, defaults, _mime = CARD_FORMATS[fmt]
+    if flatten is None:
+        flatten = fmt == 'jpeg'
+    if width and width < img.width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.Resampling.LANCZOS)
+    if flatten and img.mode == 'RGBA':
+        background = Image.new('RGB', img.size, FLATTEN_BACKGROUND)
+        background.paste(img, (0, 0), img)
+        img = background
+    buf = BytesIO()
+    img.save(buf, format=pil_format, **{**defaults, **options})
+    return buf.getvalue()
+
+def generate_report_card(latest_pm25, level, color_hex, emoji, advice_details, date_str, lang, t, timings=None,
+                         fmt='png', width=None, flatten=None, **options):
+    """
+    Renders the report card and encodes it (see encode_card; full-size PNG by default).
+    Pass a dict as 'timings' to collect per-phase durations in milliseconds
+    (fonts, text_layout, canvas, icons, draw, corners, encode).
+    """
+    timer = RenderTimer(timings)
+    img = render_report_card(latest_pm25, level, color_hex, emoji, advice_details, date_str, lang, t, timer)
+    card_bytes = encode_card(img, fmt, width, flatten, **options)
+    timer.mark('encode')
+    return card_bytes
+
+
+# --- Rendered Card Cache ---
+# A card cache is any object with two methods (MemoryCardCache and DiskCardCache below):
+#   get(key)        returns the cached encoded bytes for key, or None
+#   put(key, data)  stores encoded bytes under key
+# Keys are tuples of plain values (see CardRenderer.cache_key). Both methods may be called
+# from several threads at once.
+class MemoryCardCache:
+    """In-process LRU of at most max_size cards; safe to share between threads."""
+
+    def __init__(self, max_size=CARD_CACHE_SIZE):
+        self.max_size = max_size
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._cards.get(key)
+            if data is not None:
+                self._cards.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._cards[key] = data
+            self._cards.move_to_end(key)
+            while len(self._cards) > self.max_size:
+                self._cards.popitem(last=False)
+
+class DiskCardCache:
+    """
+    Cards stored as files in a directory, shared by every process pointed at it
+    (dashboard replicas, batch workers). Files are written atomically; beyond
+    max_files the least recently written ones are removed.
+    """
+
+    def __init__(self, directory, max_files=1000):
+        self.directory = directory
+        self.max_files = max_files
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.card")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._prune()
+        except OSError as e:
+            # A cache write failure only costs a re-render later
+            print(f"Could not write card cache entry: {e}")
+
+    def _prune(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".card")]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+class CardRenderer:
+    """Renders encoded report cards, consulting its card cache (get/put, see above) first."""
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else MemoryCardCache()
+
+    @staticmethod
+    def cache_key(latest_pm25, date_str, lang, fmt='png', width=None):
+        """
+        Everything that changes the card's pixels: the AQI level (theme, level text, advice),
+        the reading itself (gauge arc and number), the language and the displayed date,
+        plus the output encoding, the renderer version and the asset pack version.
+        """
+        return (RENDERER_VERSION, get_asset_pack()['version'], aqi_level_index(latest_pm25),
+                float(latest_pm25), lang, date_str, fmt, width)
+
+    def get_card(self, latest_pm25, level, color_hex, emoji, advice_details, date_str, lang, t, fmt='png', width=None):
+        """
+        Returns the encoded report card (full-size PNG by default), rendering only on a
+        cache miss. Same arguments as generate_report_card.
+        """
+        key = self.cache_key(latest_pm25, date_str, lang, fmt, width)
+        card_bytes = self.cache.get(key)
+        if card_bytes is None:
+            card_bytes = generate_report_card(latest_pm25, level, color_hex, emoji, advice_details, date_str, lang, t,
+                                              fmt=fmt, width=width)
+            self.cache.put(key, card_bytes)
+        return card_bytes
@@ -1,55 +1,339 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import threading
+import time
+from data_sources import get_source
+from data_store import LocalStore
 
-# --- Google Sheets Connection & Data Loading ---
-@st.cache_data(ttl=600) # Cache data for 10 minutes
-def load_data():
+# Manually define headers to avoid duplicate/empty header issues
+EXPECTED_HEADERS = ["Datetime", "PM2.5", "Date", "Time"]
+
+# In-memory schema of the snapshot. 'Date'/'Time' only repeat 'Datetime' as text and
+# are dropped at parse time. One year of hourly readings (8,760 rows) takes
+# 8 + 4 bytes per row, about 103 KiB (vs ~430 KiB with float64 and the two text
+# columns as Python strings); bench_pipeline.py reports the measured figure and fails
+# if the schema changes or one year exceeds 110 KiB.
+SNAPSHOT_DTYPES = {'Datetime': 'datetime64[ns]', 'PM2.5': 'float32'}
+
+# Re-read the whole sheet every 6 hours to pick up rows edited in place
+FULL_RESYNC_INTERVAL = 6 * 60 * 60
+
+# A snapshot older than this is still served, but triggers a background refresh
+REFRESH_INTERVAL = 600
+
+# --- Incremental Sync State (shared by every session in this process) ---
+# 'rows_ingested' counts data rows (header excluded) already parsed, so the
+# next delta fetch starts right after them. 'last_row' keeps the raw values of
+# the last ingested row to detect edits/deletions that shift the sheet.
+_sync_lock = threading.Lock()
+_sync_state = {
+    'df': None,
+    'rows_ingested': 0,
+    'last_row': None,
+    'last_full_sync': 0.0,
+    'force_full': False,
+}
+
+_store = LocalStore()
+
+def _normalize_row(row):
+    """Pads/truncates a raw sheet row to exactly the expected 4 columns."""
+    return (list(row) + [""] * len(EXPECTED_HEADERS))[:len(EXPECTED_HEADERS)]
+
+def _column(rows, index):
+    """Values of one sheet column across all rows ('' where a row is too short)."""
+    return [row[index] if len(row) > index else "" for row in rows]
+
+def _parse_rows(rows):
+    """
+    Converts raw sheet rows into a cleaned DataFrame sorted oldest first.
+    Only the rows passed in are parsed, so delta fetches stay cheap.
+    The frame is built column by column in the compact SNAPSHOT_DTYPES schema;
+    the sheet's redundant Date/Time text columns are not kept.
+    """
+    # --- Data Cleaning and Type Conversion ---
+    # Convert 'Datetime' to datetime64 and 'PM2.5' to numeric, coercing errors to NaT/NaN
+    df = pd.DataFrame({
+        'Datetime': pd.to_datetime(pd.Series(_column(rows, 0), dtype=object), errors='coerce'),
+        'PM2.5': pd.to_numeric(pd.Series(_column(rows, 1), dtype=object), errors='coerce'),
+    })
+
+    # Drop rows where critical data ('PM2.5', 'Datetime') is missing
+    df = df.dropna(subset=['PM2.5', 'Datetime']).astype(SNAPSHOT_DTYPES)
+
+    # Sort by Datetime ascending so date ranges can be located by binary search
+    return df.sort_values(by="Datetime", kind="stable").reset_index(drop=True)
+
+def _compact(df):
+    """Brings a frame from an older store layout (Date/Time text, float64) to SNAPSHOT_DTYPES."""
+    df = df[list(SNAPSHOT_DTYPES)]
+    if dict(df.dtypes) != {col: np.dtype(dtype) for col, dtype in SNAPSHOT_DTYPES.items()}:
+        df = df.astype(SNAPSHOT_DTYPES)
+    return df
+
+def _merge_rows(df_old, df_new):
+    """
+    Appends freshly parsed rows to the existing frame.
+    Appended log rows are normally newer than everything ingested so far, in which
+    case a concat keeps the order; otherwise fall back to a full re-sort.
+    """
+    if df_new.empty:
+        return df_old
+    if df_old is None or df_old.empty:
+        return df_new
+    merged = pd.concat([df_old, df_new], ignore_index=True)
+    if df_new['Datetime'].iloc[0] < df_old['Datetime'].iloc[-1]:
+        merged = merged.sort_values(by="Datetime", kind="stable").reset_index(drop=True)
+    return merged
+
+def day_bounds(datetimes, start_date, end_date=None):
+    """
+    Returns the (lo, hi) positions of the rows falling on start_date..end_date (inclusive
+    calendar days) in an ascending datetime64 array, found by binary search.
+    Slicing with .iloc[lo:hi] then selects the range without scanning the column.
+    """
+    end_date = start_date if end_date is None else end_date
+    values = np.asarray(datetimes, dtype='datetime64[ns]')
+    lo = values.searchsorted(np.datetime64(pd.Timestamp(start_date).normalize()), side='left')
+    hi = values.searchsorted(np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)), side='left')
+    return lo, hi
+
+class Snapshot:
+    """
+    Immutable view of the PM2.5 log for one data version, shared by every session.
+    Built once per version from the synced frame. The columns are backed by read-only
+    numpy arrays, so nothing downstream can modify them in place, and `df` hands out a
+    zero-copy frame over them (added columns or re-sorts stay local to the caller).
+    """
+    __slots__ = ('version', 'datetimes', 'pm25', '_frame')
+
+    def __init__(self, df, version):
+        datetimes = df['Datetime'].to_numpy(dtype='datetime64[ns]', copy=True)
+        pm25 = df['PM2.5'].to_numpy(dtype=SNAPSHOT_DTYPES['PM2.5'], copy=True)
+        datetimes.flags.writeable = False
+        pm25.flags.writeable = False
+        frame = pd.DataFrame({'Datetime': datetimes, 'PM2.5': pm25}, copy=False)
+        for name, value in (('version', version), ('datetimes', datetimes), ('pm25', pm25), ('_frame', frame)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is read-only")
+
+    def __len__(self):
+        return len(self.pm25)
+
+    @property
+    def empty(self):
+        return len(self.pm25) == 0
+
+    @property
+    def df(self):
+        """Oldest-first DataFrame over the shared arrays (no data is copied)."""
+        return self._frame.copy(deep=False)
+
+    @property
+    def latest_datetime(self):
+        return pd.Timestamp(self.datetimes[-1])
+
+    @property
+    def latest_pm25(self):
+        return self.pm25[-1]
+
+    def day_slice(self, start_date, end_date=None):
+        """Rows from start_date through end_date (inclusive days), located by binary search."""
+        lo, hi = day_bounds(self.datetimes, start_date, end_date)
+        return self.df.iloc[lo:hi]
+
+def _full_sync(source):
+    data = source.fetch_rows(0)
+    _sync_state['df'] = _parse_rows(data)
+    _sync_state['rows_ingested'] = len(data)
+    _sync_state['last_row'] = _normalize_row(data[-1]) if data else None
+    _sync_state['last_full_sync'] = time.time()
+    _sync_state['force_full'] = False
+
+def _delta_sync(source):
     """
-    Loads data from the specified Google Sheet and returns it as a Pandas DataFrame.
-    Handles authentication using Streamlit Secrets.
+    Fetches only the rows appended since the last sync with a bounded range read.
+    The last ingested row is re-read as an anchor; if it no longer matches, rows
+    were edited or removed above it and a full resync is performed instead.
+    Returns True if the frame changed.
     """
+    rows = source.fetch_rows(_sync_state['rows_ingested'] - 1)
+    if not rows or _normalize_row(rows[0]) != _sync_state['last_row']:
+        _full_sync(source)
+        return True
+
+    new_rows = rows[1:]
+    if not new_rows:
+        return False
+    _sync_state['df'] = _merge_rows(_sync_state['df'], _parse_rows(new_rows))
+    _sync_state['rows_ingested'] += len(new_rows)
+    _sync_state['last_row'] = _normalize_row(new_rows[-1])
+    return True
+
+def _save_to_store(source):
+    meta = {
+        'source_id': source.source_id,
+        'rows_ingested': _sync_state['rows_ingested'],
+        'last_row': _sync_state['last_row'],
+        'last_full_sync': _sync_state['last_full_sync'],
+    }
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"], scopes=scopes
+        _store.save(_sync_state['df'], meta)
+    except OSError as e:
+        # The local copy is only a startup accelerator; never fail a sync over it
+        print(f"Could not write local data store: {e}")
+
+def _warm_start(source):
+    """Fills the in-process state from the local store. Returns True if a stored frame was found."""
+    df, meta = _store.load(source.source_id)
+    if df is None:
+        return False
+    df = _compact(df)
+    if not df['Datetime'].is_monotonic_increasing:
+        # Stores written before the frame was kept oldest first
+        df = df.sort_values(by="Datetime", kind="stable").reset_index(drop=True)
+    _sync_state['df'] = df
+    _sync_state['rows_ingested'] = meta['rows_ingested']
+    _sync_state['last_row'] = meta['last_row']
+    _sync_state['last_full_sync'] = meta['last_full_sync']
+    return True
+
+def request_full_resync():
+    """Marks the next sync as a full re-download (e.g. after rows were edited in the sheet)."""
+    with _sync_lock:
+        _sync_state['force_full'] = True
+
+def _sync():
+    """
+    Brings the in-process frame up to date with the data source. Returns True if it changed.
+    Runs a full download on first use, when requested, or every FULL_RESYNC_INTERVAL;
+    otherwise only the newly appended rows are fetched and merged.
+    Every change is written through to the local store.
+    """
+    with _sync_lock:
+        source = get_source()
+        if _sync_state['df'] is None:
+            _warm_start(source)
+        needs_full = (
+            _sync_state['df'] is None
+            or _sync_state['force_full']
+            or _sync_state['last_row'] is None
+            or time.time() - _sync_state['last_full_sync'] >= FULL_RESYNC_INTERVAL
         )
-        client = gspread.authorize(creds)
-        
-        SPREADSHEET_ID = "1-Une9oA0-ln6ApbhwaXFNpkniAvX7g1K9pNR800MJwQ"
-        SHEET_NAME = "PM2.5 Log"
-        
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        sheet = spreadsheet.worksheet(SHEET_NAME)
-        
-        # Fetch all values, skipping the header row
-        data = sheet.get_all_values()[1:] 
-        
-        # Manually define headers to avoid duplicate/empty header issues
-        expected_headers = ["Datetime", "PM2.5", "Date", "Time"]
-        
-        # Ensure we only take the first 4 columns to match headers
-        data_subset = [row[:4] for row in data]
-        
-        df = pd.DataFrame(data_subset, columns=expected_headers)
-
-        # --- Data Cleaning and Type Conversion ---
-        # Convert 'PM2.5' to numeric, coercing errors to NaN (Not a Number)
-        df['PM2.5'] = pd.to_numeric(df['PM2.5'], errors='coerce')
-        # Convert 'Datetime' to datetime objects, coercing errors
-        df['Datetime'] = pd.to_datetime(df['Datetime'], errors='coerce')
-        
-        # Drop rows where critical data ('PM2.5', 'Datetime') is missing
-        df.dropna(subset=['PM2.5', 'Datetime'], inplace=True)
-        
-        # Sort by Datetime in descending order to get the latest data first
-        df = df.sort_values(by="Datetime", ascending=False).reset_index(drop=True)
-        
-        return df
-        
+        if needs_full:
+            _full_sync(source)
+            changed = True
+        else:
+            changed = _delta_sync(source)
+        if changed:
+            _save_to_store(source)
+        return changed
+
+def sync_data():
+    """Synchronously syncs with the data source and returns the up-to-date frame."""
+    _sync()
+    return _sync_state['df']
+
+# --- Background Refresher (stale-while-revalidate) ---
+class DataRefresher:
+    """
+    Owns the last good Snapshot of the log for the whole process.
+    Readers always get the current snapshot immediately; once it is older than
+    REFRESH_INTERVAL (or a refresh is requested) a daemon thread re-syncs in the
+    background and swaps in a new Snapshot, bumping the version when data changed.
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL):
+        self.interval = interval
+        self.snapshot = None
+        self.version = 0
+        self.refreshed_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _publish(self, changed):
+        with self._lock:
+            if changed or self.snapshot is None:
+                self.version += 1
+                self.snapshot = Snapshot(_sync_state['df'], self.version)
+            self.refreshed_at = time.time()
+            self.last_error = None
+
+    def _refresh_once(self):
+        try:
+            self._publish(_sync())
+        except Exception as e:
+            # Keep serving the last good snapshot; the next request retries
+            self.last_error = e
+            self.refreshed_at = time.time()
+            print(f"Background data refresh failed: {e}")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._refresh_once()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="pm25-data-refresher", daemon=True)
+            self._thread.start()
+
+    def request_refresh(self):
+        """Schedules a background refresh without waiting for it."""
+        with self._lock:
+            self._ensure_thread()
+        self._wakeup.set()
+
+    def current(self):
+        """
+        Returns the last good Snapshot (None if nothing could be loaded yet).
+        Only the very first call of a process without a local store blocks on the source.
+        """
+        with self._lock:
+            if self.snapshot is None and _warm_start_snapshot():
+                self.version += 1
+                self.snapshot = Snapshot(_sync_state['df'], self.version)
+        if self.snapshot is None:
+            self._refresh_once()
+        elif time.time() - self.refreshed_at >= self.interval:
+            self.request_refresh()
+        return self.snapshot
+
+def _warm_start_snapshot():
+    with _sync_lock:
+        return _sync_state['df'] is not None or _warm_start(get_source())
+
+@st.cache_resource
+def get_refresher():
+    """Process-wide refresher shared by every session (survives script reruns)."""
+    return DataRefresher()
+
+def request_refresh():
+    """Schedules a background data refresh; never evicts any Streamlit cache."""
+    get_refresher().request_refresh()
+
+# --- Data Loading ---
+def load_data():
+    """
+    Returns the latest PM2.5 Snapshot without waiting on the source.
+    On a cold process the local store is served immediately and the remote sync runs in the
+    background. Every session shares the same read-only Snapshot object; nothing is copied
+    per rerun. Its version stamp keys all derived caches.
+    """
+    refresher = get_refresher()
+    try:
+        snapshot = refresher.current()
     except Exception as e:
+        snapshot = None
+        refresher.last_error = e
+    if snapshot is None:
         # Display an error message in the app if something goes wrong
-        st.error(f"ไม่สามารถโหลดข้อมูลจาก Google Sheet ได้ (An error occurred while loading data from Google Sheets): {e}")
+        st.error(f"ไม่สามารถโหลดข้อมูลจาก Google Sheet ได้ (An error occurred while loading data from Google Sheets): {refresher.last_error}")
         return None
-
+    return snapshot
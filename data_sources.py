@@ -0,0 +1,73 @@
+import csv
+import os
+import streamlit as st
+
+SPREADSHEET_ID = "1-Une9oA0-ln6ApbhwaXFNpkniAvX7g1K9pNR800MJwQ"
+SHEET_NAME = "PM2.5 Log"
+
+# Set this to a CSV file (same column layout as the sheet, header row first)
+# to run the whole pipeline offline, e.g. for tests or demos.
+CSV_PATH_ENV = "PM25_CSV_PATH"
+
+# --- Source Interface ---
+# A source returns raw log rows as lists of strings, header excluded.
+# fetch_rows(start) returns every data row from 0-based index 'start' onwards,
+# so fetch_rows(0) is a full read and fetch_rows(n) a bounded tail read.
+class GoogleSheetSource:
+    """Reads the "PM2.5 Log" worksheet through gspread using Streamlit Secrets."""
+
+    source_id = f"gsheet:{SPREADSHEET_ID}/{SHEET_NAME}"
+
+    def __init__(self):
+        self._sheet = None
+
+    def _open(self):
+        if self._sheet is None:
+            # gspread/google-auth take ~0.2 s to import; only pay for it when the sheet is read,
+            # which on a warm-started process happens in the background refresher.
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+            creds = Credentials.from_service_account_info(
+                st.secrets["gcp_service_account"], scopes=scopes
+            )
+            client = gspread.authorize(creds)
+            spreadsheet = client.open_by_key(SPREADSHEET_ID)
+            self._sheet = spreadsheet.worksheet(SHEET_NAME)
+        return self._sheet
+
+    def fetch_rows(self, start=0):
+        sheet = self._open()
+        if start == 0:
+            # Fetch all values, skipping the header row
+            return sheet.get_all_values()[1:]
+        # Sheet row numbers are 1-based and row 1 is the header
+        return sheet.get_values(f"A{start + 2}:D")
+
+class CSVSource:
+    """Reads log rows from a local CSV file laid out like the Google Sheet."""
+
+    def __init__(self, path):
+        self.path = path
+        self.source_id = f"csv:{os.path.abspath(path)}"
+
+    def fetch_rows(self, start=0):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))[1:]
+        return rows[start:]
+
+_source = None
+
+def set_source(source):
+    """Overrides the data source for this process (tests, offline deployments)."""
+    global _source
+    _source = source
+
+def get_source():
+    """Returns the configured source: the CSV fixture if PM25_CSV_PATH is set, else Google Sheets."""
+    global _source
+    if _source is None:
+        csv_path = os.environ.get(CSV_PATH_ENV)
+        _source = CSVSource(csv_path) if csv_path else GoogleSheetSource()
+    return _source
@@ -0,0 +1,46 @@
+import json
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Where the local copy of the log lives; override with PM25_DATA_DIR
+DATA_DIR = os.environ.get("PM25_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+FRAME_FILE = "pm25_log.feather"
+META_FILE = "pm25_log.meta.json"
+
+class LocalStore:
+    """
+    Persistent on-disk copy of the parsed PM2.5 log.
+    The frame is kept as an uncompressed Feather (Arrow IPC) file so it can be
+    memory-mapped at startup; the sync bookkeeping sits next to it as JSON.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.frame_path = os.path.join(data_dir, FRAME_FILE)
+        self.meta_path = os.path.join(data_dir, META_FILE)
+
+    def load(self, source_id):
+        """Returns (df, meta) for the given source, or (None, None) if nothing usable is stored."""
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get('source_id') != source_id:
+                return None, None
+            table = feather.read_table(self.frame_path, memory_map=True)
+            return table.to_pandas(split_blocks=True), meta
+        except (OSError, ValueError, pa.ArrowException):
+            return None, None
+
+    def save(self, df, meta):
+        """Atomically replaces the stored frame and metadata (write to temp file, then rename)."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_frame = self.frame_path + ".tmp"
+        tmp_meta = self.meta_path + ".tmp"
+        # Uncompressed so the file can be memory-mapped instead of decoded
+        feather.write_feather(df, tmp_frame, compression="uncompressed")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_frame, self.frame_path)
+        os.replace(tmp_meta, self.meta_path)
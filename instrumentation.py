@@ -0,0 +1,79 @@
+import contextvars
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+import streamlit as st
+
+# Opt-in: set PM25_PROFILE=1 for every session, or open the app with ?debug=1
+PROFILE_ENV = "PM25_PROFILE"
+
+# Stats dict of the section currently running in this script thread (None when off)
+_current_section = contextvars.ContextVar("pm25_render_section", default=None)
+
+def profiling_enabled():
+    """True if render profiling was requested via PM25_PROFILE=1 or the ?debug=1 query param."""
+    if os.environ.get(PROFILE_ENV) == "1":
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+def record_rows(count):
+    """Adds to the number of DataFrame rows the current section worked on."""
+    stats = _current_section.get()
+    if stats is not None:
+        stats['rows'] += int(count)
+
+def record_html(html):
+    """Adds the size of an HTML/markdown fragment sent by the current section."""
+    stats = _current_section.get()
+    if stats is not None:
+        stats['html_bytes'] += len(html.encode("utf-8"))
+
+def record_figure(fig):
+    """Adds the serialized size of a Plotly figure sent by the current section."""
+    stats = _current_section.get()
+    if stats is not None:
+        stats['figure_bytes'] += len(fig.to_json().encode("utf-8"))
+
+class RenderProfile:
+    """
+    Collects per-section wall time, rows touched and bytes of HTML/figure JSON emitted
+    during one script run. When disabled, section() is a plain pass-through.
+    finish() prints one JSON log line per section and shows the debug panel.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.rerun_id = uuid.uuid4().hex[:8]
+        self.sections = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        stats = {'section': name, 'rows': 0, 'html_bytes': 0, 'figure_bytes': 0}
+        token = _current_section.set(stats)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats['ms'] = round((time.perf_counter() - start) * 1000, 2)
+            _current_section.reset(token)
+            self.sections.append(stats)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        total_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        for stats in self.sections:
+            print(json.dumps({'event': 'render_section', 'rerun_id': self.rerun_id, **stats}))
+        print(json.dumps({'event': 'render_total', 'rerun_id': self.rerun_id, 'ms': total_ms}))
+
+        with st.expander(f"🛠 Render profile ({total_ms:.0f} ms)", expanded=False):
+            st.dataframe(self.sections, use_container_width=True)
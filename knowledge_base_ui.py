@@ -1,6 +1,5 @@
 import streamlit as st
 import random
-import markdown
 
 def display_knowledge_base(lang, t):
     st.header(t[lang]['quiz_header'])
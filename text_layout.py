@@ -0,0 +1,158 @@
+import functools
+import threading
+
+# Thai characters that cause stacking issues
+THAI_UPPER_VOWELS = frozenset(['ั', 'ิ', 'ี', 'ึ', 'ื', '็', 'ํ'])
+THAI_TONES = frozenset(['่', '้', '๊', '๋', '์'])
+
+# While the summed glyph advances of a run stay this many font sizes below the limit,
+# the run certainly fits (no glyph overhangs its advance by a full em), so the exact
+# textbbox measurement is only needed close to the break point.
+EXACT_MEASURE_MARGIN_EM = 1.0
+
+def is_thai_combining_char(char):
+    """Check if the character is a Thai combining vowel or tone mark."""
+    code = ord(char)
+    return 0x0E31 <= code <= 0x0E4E or code == 0x0E30
+
+class _LayoutCache:
+    """Small thread-safe memo table; cleared wholesale when it reaches max_size."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.max_size:
+                self._data.clear()
+            self._data[key] = value
+        return value
+
+# Fonts come from the process-wide font registry, so font objects are stable keys
+_bbox_cache = _LayoutCache(8192)
+_wrap_cache = _LayoutCache(1024)
+_thai_cache = _LayoutCache(1024)
+
+@functools.lru_cache(maxsize=4096)
+def glyph_advance(font, char):
+    """Advance width of a single character, cached per (font, char)."""
+    return font.getlength(char)
+
+def text_bbox(draw, text, font):
+    """draw.textbbox((0, 0), text, font=font), memoized per (font, image mode, text)."""
+    key = (font, draw.mode, text)
+    bbox = _bbox_cache.get(key)
+    if bbox is None:
+        bbox = _bbox_cache.put(key, draw.textbbox((0, 0), text, font=font))
+    return bbox
+
+def _text_width(draw, text, font):
+    bbox = text_bbox(draw, text, font)
+    return bbox[2] - bbox[0]
+
+def _split_long_word(word, font, max_width, draw, lines):
+    """
+    Breaks a word wider than max_width into character runs. Gives the same breaks as
+    measuring every growing prefix with textbbox, but accumulates cached glyph advances
+    and only measures exactly once the run is within EXACT_MEASURE_MARGIN_EM of the limit.
+    Complete runs are appended to 'lines'; the unfinished last run is returned.
+    """
+    safe_width = max_width - font.size * EXACT_MEASURE_MARGIN_EM
+    temp = ""
+    temp_advance = 0.0
+    for char in word:
+        char_advance = glyph_advance(font, char)
+        check_str = temp + char
+        if temp_advance + char_advance <= safe_width or text_bbox(draw, check_str, font)[2] <= max_width:
+            temp = check_str
+            temp_advance += char_advance
+        else:
+            if is_thai_combining_char(char) and len(temp) > 0:
+                last_char = temp[-1]
+                lines.append(temp[:-1])
+                temp = last_char + char
+            else:
+                lines.append(temp)
+                temp = char
+            temp_advance = sum(glyph_advance(font, c) for c in temp)
+    return temp
+
+def _wrap_text(text, font, max_width, draw):
+    lines = []
+    if not text: return lines
+
+    words = text.split(' ')
+    current_line = ""
+
+    for word in words:
+        test_line = current_line + " " + word if current_line else word
+
+        if _text_width(draw, test_line, font) <= max_width:
+            current_line = test_line
+        else:
+            if _text_width(draw, word, font) > max_width:
+                if current_line:
+                    lines.append(current_line)
+                current_line = _split_long_word(word, font, max_width, draw, lines)
+            else:
+                if current_line: lines.append(current_line)
+                current_line = word
+
+    if current_line: lines.append(current_line)
+    return lines
+
+def wrap_text(text, font, max_width, draw):
+    """
+    Greedy word wrap, falling back to character breaks for over-long words while keeping
+    Thai combining marks with their base character. Memoized per (text, font, max_width),
+    so the fixed advice strings are laid out once per process.
+    """
+    key = (text, font, max_width, draw.mode)
+    lines = _wrap_cache.get(key)
+    if lines is None:
+        lines = _wrap_cache.put(key, tuple(_wrap_text(text, font, max_width, draw)))
+    return list(lines)
+
+def thai_text_layout(text, font):
+    """
+    Splits Thai text into the base string (tones stacked on upper vowels removed) and the
+    removed tones as (char, prefix_width, center_offset, lift), relative to where the base
+    text starts. Memoized per (text, font), so prefixes are measured once per string.
+    """
+    key = (text, font)
+    layout = _thai_cache.get(key)
+    if layout is not None:
+        return layout
+
+    # 1. Separate base text and problematic tones
+    base_text_chars = []
+    adjustments = []
+
+    for i, char in enumerate(text):
+        # Check for Tone atop Upper Vowel collision
+        if i > 0 and char in THAI_TONES and text[i-1] in THAI_UPPER_VOWELS:
+            # Record this tone to draw manually later
+            adjustments.append((char, len(base_text_chars) - 1))
+        else:
+            base_text_chars.append(char)
+
+    base_text = "".join(base_text_chars)
+
+    # 2. Tone placement
+    # Lift by ~25% of font size relative to the line top
+    shift_amount = font.size * 0.25
+    tones = []
+    for char, vowel_idx in adjustments:
+        # Measure width up to the vowel
+        prefix_w = font.getlength(base_text[:vowel_idx])
+        # Get widths of the vowel and the tone to center the tone over the vowel
+        vowel_w = glyph_advance(font, base_text[vowel_idx])
+        tone_w = glyph_advance(font, char)
+        tones.append((char, prefix_w, (vowel_w - tone_w) / 2, shift_amount))
+
+    return _thai_cache.put(key, (base_text, tuple(tones)))
@@ -8,6 +8,7 @@ TRANSLATIONS = {
         'advice_header': "คำแนะนำในการปฏิบัติตัว",
         'aqi_guideline_header': "เกณฑ์ดัชนีคุณภาพอากาศ",
         'refresh_button': "รีเฟรชข้อมูล",
+        'refresh_scheduled': "กำลังอัปเดตข้อมูลเบื้องหลัง ข้อมูลใหม่จะแสดงในการรีเฟรชครั้งถัดไป",
         'download_button': "การ์ดแจ้งเตือนค่าฝุ่น",
         'report_card_footer': "ด้วยความปรารถนาดี จากกลุ่มงานอาชีวเวชกรรม รพ.สันทราย",
         'hourly_trend_today': "แนวโน้มค่า PM2.5 รายชั่วโมงของวันนี้",
@@ -34,6 +35,9 @@ TRANSLATIONS = {
         'metric_max': "ค่าสูงสุด",
         'metric_min': "ค่าต่ำสุด",
         'daily_avg_chart_title': "ค่าเฉลี่ย PM2.5 รายวัน",
+        'weekly_avg_chart_title': "ค่าเฉลี่ย PM2.5 รายสัปดาห์",
+        'monthly_avg_chart_title': "ค่าเฉลี่ย PM2.5 รายเดือน",
+        'peak_daily_avg': "ค่าเฉลี่ยรายวันสูงสุด",
         'avg_pm25_unit': "ค่าเฉลี่ย PM2.5 (μg/m³)",
         'aqi_level_1': "อากาศดีมาก",
         'aqi_level_2': "อากาศดี",
@@ -66,6 +70,7 @@ TRANSLATIONS = {
         'advice_header': "Health Recommendations",
         'aqi_guideline_header': "Air Quality Index (AQI) Guideline",
         'refresh_button': "Refresh Data",
+        'refresh_scheduled': "Updating data in the background. New readings will appear on the next refresh.",
         'download_button': "PM2.5 Alert Card",
         'report_card_footer': "With best wishes from the Occupational Medicine Dept., San Sai Hospital.",
         'hourly_trend_today': "Today's Hourly PM2.5 Trend",
@@ -92,6 +97,9 @@ TRANSLATIONS = {
         'metric_max': "Maximum",
         'metric_min': "Minimum",
         'daily_avg_chart_title': "Daily Average PM2.5",
+        'weekly_avg_chart_title': "Weekly Average PM2.5",
+        'monthly_avg_chart_title': "Monthly Average PM2.5",
+        'peak_daily_avg': "Peak daily average",
         'avg_pm25_unit': "Average PM2.5 (μg/m³)",
         'aqi_level_1': "Excellent",
         'aqi_level_2': "Good",
@@ -1,11 +1,17 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import plotly.graph_objects as go
 from datetime import datetime
 import calendar
 import pandas as pd
+import numpy as np
 import math
-from utils import get_aqi_level
+from utils import get_aqi_level, classify_pm25
+from data_loader import request_refresh, day_bounds
+from aggregates import get_aggregates, choose_resolution, downsample_daily
+from instrumentation import record_rows, record_html, record_figure
+
+# Plotly figures kept per (date range, lang, snapshot version) for each chart
+FIGURE_CACHE_SIZE = 32
 
 def inject_custom_css():
     """Injects custom CSS to make the app responsive and theme-aware."""
@@ -297,27 +303,15 @@ def inject_custom_css():
         width=0
     )
 
-def display_realtime_pm(df, lang, t, date_str):
-    latest_pm25 = df['PM2.5'][0]
+@st.fragment
+def display_realtime_pm(snapshot, lang, t, date_str):
+    latest_pm25 = snapshot.latest_pm25
     level_text, color, emoji, advice = get_aqi_level(latest_pm25, lang, t)
     advice_details = advice['details']
     
-    # --- Color & Theme Logic ---
-    if latest_pm25 <= 15: # Excellent
-        bg_color = "#0099FF" # Updated Blue
-        accent_color = "#0099FF"
-    elif latest_pm25 <= 25: # Good
-        bg_color = "#2ECC71" # Updated Green
-        accent_color = "#2ECC71"
-    elif latest_pm25 <= 37.5: # Moderate
-        bg_color = "#F1C40F" # Updated Yellow
-        accent_color = "#F1C40F"
-    elif latest_pm25 <= 75: # Unhealthy
-        bg_color = "#E67E22" # Updated Orange
-        accent_color = "#E67E22"
-    else: # Hazardous
-        bg_color = "#E74C3C" # Updated Red
-        accent_color = "#E74C3C"
+    # --- Color & Theme Logic (from the shared AQI breakpoint table) ---
+    bg_color = color
+    accent_color = color
 
     # Gauge Calculation
     percent = min((latest_pm25 / 120) * 100, 100)
@@ -350,6 +344,7 @@ def display_realtime_pm(df, lang, t, date_str):
 </div>
 </div>
 """
+        record_html(html_left)
         st.markdown(html_left, unsafe_allow_html=True)
 
     # --- RIGHT COLUMN ---
@@ -421,6 +416,7 @@ def display_realtime_pm(df, lang, t, date_str):
 </div>
 </div>
 """
+        record_html(html_right)
         st.markdown(html_right, unsafe_allow_html=True)
 
     st.write("")
@@ -429,22 +425,28 @@ def display_realtime_pm(df, lang, t, date_str):
     b_col1, b_col2 = st.columns([1, 1])
     with b_col1:
         if st.button(f"🔄 {t[lang]['refresh_button']}", use_container_width=True):
-            st.cache_data.clear()
-            st.rerun()
+            # Only schedule a data refresh; fonts/icons and other caches stay warm
+            request_refresh()
+            st.toast(t[lang]['refresh_scheduled'])
     with b_col2:
-        from card_generator import generate_report_card
-        report_card_bytes = generate_report_card(latest_pm25, level_text, color, emoji, advice_details, date_str, lang, t)
-        if report_card_bytes:
-            st.download_button(
-                label=f"🖼️ {t[lang]['download_button']}",
-                data=report_card_bytes,
-                file_name=f"pm25_report_{datetime.now().strftime('%Y%m%d_%H%M')}.png",
-                mime="image/png",
-                use_container_width=True)
+        # Deferred download: the card is rendered (or served from the card cache)
+        # only when the button is clicked, not on every rerun.
+        st.download_button(
+            label=f"🖼️ {t[lang]['download_button']}",
+            data=lambda: _report_card(latest_pm25, level_text, color, emoji, advice_details, date_str, lang, t),
+            file_name=f"pm25_report_{datetime.now().strftime('%Y%m%d_%H%M')}.png",
+            mime="image/png",
+            on_click="ignore",
+            use_container_width=True)
+
+def _report_card(latest_pm25, level_text, color, emoji, advice_details, date_str, lang, t):
+    # Pillow and the card assets are only imported once someone actually downloads a card
+    from card_generator import get_report_card
+    return get_report_card(latest_pm25, level_text, color, emoji, advice_details, date_str, lang, t)
 
 def display_external_assessment(lang, t):
     st.subheader(t[lang]['external_assessment_title'])
-    st.markdown(f"""
+    html_assessment = f"""
 <style>
 .assessment-card {{
     /* Use semi-transparent background for theme adaptability */
@@ -488,9 +490,11 @@ box-shadow: 0 6px 14px rgba(30, 144, 255, 0.3);
 {t[lang]['assessment_button_text']}
 </a>
 </div>
-""", unsafe_allow_html=True)
+"""
+    record_html(html_assessment)
+    st.markdown(html_assessment, unsafe_allow_html=True)
 
-def display_health_impact(df, lang, t):
+def display_health_impact(snapshot, lang, t):
     current_year = datetime.now().year
     if lang == 'th':
         start_str = f"1 {t['th']['month_names'][0]} {current_year + 543}"
@@ -501,32 +505,45 @@ def display_health_impact(df, lang, t):
         end_date = datetime(current_year, 12, 31)
         date_range = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
     st.subheader(t[lang]['health_impact_title'].format(date_range=date_range))
-    df_current_year = df[df['Datetime'].dt.year == current_year]
-    if df_current_year.empty:
+    yearly = get_aggregates(snapshot)['yearly']
+    record_rows(len(yearly))
+    if current_year not in yearly.index:
         st.info(t[lang]['no_data_for_year'])
         return
-    daily_avg_df = df_current_year.groupby(df_current_year['Datetime'].dt.date)['PM2.5'].mean().reset_index()
-    unhealthy_days = daily_avg_df[daily_avg_df['PM2.5'] > 37.5]
-    num_unhealthy_days = len(unhealthy_days)
-    total_pm_exposure = daily_avg_df['PM2.5'].sum()
+    num_unhealthy_days = int(yearly.at[current_year, 'unhealthy_days'])
+    total_pm_exposure = yearly.at[current_year, 'exposure']
     equivalent_cigarettes = total_pm_exposure / 22
     col1, col2 = st.columns(2)
     col1.metric(label=t[lang]['unhealthy_days_text'], value=f"{num_unhealthy_days} {t[lang]['days_unit']}")
     col2.metric(label=t[lang]['cigarette_equivalent_text'], value=f"{int(equivalent_cigarettes)} {t[lang]['cigarettes_unit']}")
     st.caption(t[lang]['health_impact_explanation'])
 
-def display_24hr_chart(df, lang, t):
+def display_24hr_chart(snapshot, lang, t):
     st.subheader(t[lang]['hourly_trend_today'])
-    latest_date = df['Datetime'].max().date()
-    day_data = df[df['Datetime'].dt.date == latest_date].sort_values(by="Datetime", ascending=True)
-    if day_data.empty:
+    # The snapshot is sorted oldest first: today's rows are a binary-searched tail slice
+    fig_24hr = _hourly_figure(snapshot, snapshot.latest_datetime.date(), lang, t, snapshot.version)
+    if fig_24hr is None:
         st.info(t[lang]['no_data_today'])
         return
-    colors = [get_aqi_level(pm, lang, t)[1] for pm in day_data['PM2.5']]
+    record_rows(len(fig_24hr.data[0].y))
+    record_figure(fig_24hr)
+    st.plotly_chart(fig_24hr, use_container_width=True, config={'displayModeBar': False, 'scrollZoom': False})
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE)
+def _hourly_figure(_snapshot, day, lang, _t, version):
+    """Bar chart of the readings on 'day'; cached per (day, lang, snapshot version). None if no data."""
+    # The snapshot is sorted oldest first: the day's rows are a binary-searched slice
+    day_data = _snapshot.day_slice(day)
+    if day_data.empty:
+        return None
+    import plotly.graph_objects as go
+    t = _t
+    colors = classify_pm25(day_data['PM2.5'])[1].tolist()
     fig_24hr = go.Figure(go.Bar(
         x=day_data['Datetime'], y=day_data['PM2.5'], name='PM2.5',
         marker_color=colors, marker=dict(cornerradius=5),
-        text=day_data['PM2.5'].apply(lambda x: f'{x:.1f}'), textposition='outside'))
+        text=day_data['PM2.5'].apply(lambda x: f'{x:.1f}'), textposition='outside',
+        hovertemplate="%{x|%H:%M}<br>%{y:.1f} μg/m³<extra></extra>"))
     fig_24hr.update_layout(
         font=dict(family="Sarabun"),
         yaxis_title=t[lang]['pm25_unit'],
@@ -536,195 +553,240 @@ def display_24hr_chart(df, lang, t):
         yaxis=dict(gridcolor='var(--border-color, #e9e9e9)', fixedrange=True),
         showlegend=False, uniformtext_minsize=8, uniformtext_mode='hide',
         dragmode=False)
-    st.plotly_chart(fig_24hr, use_container_width=True, config={'displayModeBar': False, 'scrollZoom': False})
+    return fig_24hr
 
-def display_monthly_calendar(df, lang, t):
+@st.fragment
+def display_monthly_calendar(snapshot, lang, t):
     st.subheader(t[lang]['monthly_calendar_header'])
     st.caption(t[lang]['date_picker_label'])
-    all_years = sorted(df['Datetime'].dt.year.unique(), reverse=True)
+    agg = get_aggregates(snapshot)
+    all_years = sorted(agg['yearly'].index, reverse=True)
     def format_year(y): return str(y + 543) if lang == 'th' else str(y)
     col1, col2 = st.columns(2)
     selected_year = col1.selectbox("ปี" if lang == 'th' else "Year", options=all_years, format_func=format_year, index=0)
-    df_year = df[df['Datetime'].dt.year == selected_year]
-    available_months_num = sorted(df_year['Datetime'].dt.month.unique())
+    available_months_num = sorted(agg['monthly'].loc[selected_year].index)
     month_map = {m: t[lang]['month_names'][m-1] for m in available_months_num}
     default_month_index = len(available_months_num) - 1
     selected_month_num = col2.selectbox("เดือน" if lang == 'th' else "Month", options=available_months_num, format_func=lambda m: month_map[m], index=default_month_index)
-    year, month = selected_year, selected_month_num
-    df_calendar = df.copy()
-    df_calendar['date'] = df_calendar['Datetime'].dt.date
-    daily_avg_pm25 = df_calendar.groupby('date')['PM2.5'].mean().reset_index()
-    daily_avg_pm25['date'] = pd.to_datetime(daily_avg_pm25['date'])
-    month_data = daily_avg_pm25[(daily_avg_pm25['date'].dt.year == year) & (daily_avg_pm25['date'].dt.month == month)]
+    html_cal, days_with_data = _calendar_html(snapshot, selected_year, selected_month_num, lang, t, snapshot.version)
+    record_rows(days_with_data)
+    record_html(html_cal)
+    st.markdown(html_cal, unsafe_allow_html=True)
+
+@st.cache_data(max_entries=64)
+def _calendar_html(_snapshot, year, month, lang, _t, version):
+    """
+    Renders the calendar grid for one month. Cached per (year, month, lang, snapshot version),
+    so flipping between months only re-reads the stored fragments.
+    Returns (html, number of days with data).
+    """
+    daily = get_aggregates(_snapshot)['daily']
+    month_start = pd.Timestamp(year, month, 1)
+    lo, hi = day_bounds(daily.index, month_start, month_start + pd.offsets.MonthEnd(0))
+    month_daily = daily['mean'].iloc[lo:hi]
+
+    # Day-of-month -> daily mean / color lookup (index 0 unused, NaN = no data)
+    day_values = np.full(32, np.nan)
+    day_values[month_daily.index.day] = month_daily.to_numpy()
+    day_colors = classify_pm25(day_values)[1]
     cal = calendar.monthcalendar(year, month)
-    days_header = t[lang]['days_header_short']
-    
+    days_header = _t[lang]['days_header_short']
+
     # --- Generate Calendar HTML (Grid Layout) ---
-    html_cal = '<div class="calendar-grid-container">'
-    
+    parts = ['<div class="calendar-grid-container">']
+
     # 1. Header Row
-    for day_name in days_header:
-        html_cal += f"<div class='calendar-col-header'>{day_name}</div>"
-    
+    parts.extend(f"<div class='calendar-col-header'>{day_name}</div>" for day_name in days_header)
+
     # 2. Days
     for week in cal:
         for day in week:
             if day == 0:
-                html_cal += "<div class='calendar-day-empty'></div>"
+                parts.append("<div class='calendar-day-empty'></div>")
+            elif not np.isnan(day_values[day]):
+                parts.append(f"<div class='calendar-day' style='border-bottom-color: {day_colors[day]};'>"
+                             f"<div class='calendar-day-header'>{day}</div>"
+                             f"<div class='calendar-day-value'>{day_values[day]:.1f}</div>"
+                             "</div>")
             else:
-                day_data = month_data[month_data['date'].dt.day == day]
-                if not day_data.empty:
-                    pm_value = day_data['PM2.5'].iloc[0]
-                    _, color, _, _ = get_aqi_level(pm_value, lang, t)
-                    html_cal += f"<div class='calendar-day' style='border-bottom-color: {color};'>" \
-                                f"<div class='calendar-day-header'>{day}</div>" \
-                                f"<div class='calendar-day-value'>{pm_value:.1f}</div>" \
-                                "</div>"
-                else:
-                    html_cal += f"<div class='calendar-day calendar-day-na'>" \
-                                f"<div class='calendar-day-header'>{day}</div>" \
-                                "</div>"
-    
-    html_cal += "</div>" # End grid
-    st.markdown(html_cal, unsafe_allow_html=True)
+                parts.append(f"<div class='calendar-day calendar-day-na'>"
+                             f"<div class='calendar-day-header'>{day}</div>"
+                             "</div>")
 
-def display_historical_data(df, lang, t):
+    parts.append("</div>") # End grid
+    return "".join(parts), len(month_daily)
+
+@st.fragment
+def display_historical_data(snapshot, lang, t):
     st.subheader(t[lang]['historical_expander'])
     today = datetime.now().date()
     default_start = today - pd.DateOffset(days=6)
+    daily = get_aggregates(snapshot)['daily']
+    first_date = daily.index[0].date()
     col_date1, col_date2 = st.columns(2)
     # --- Date Input: Set format to DD/MM/YYYY ---
     with col_date1: 
-        start_date = st.date_input(t[lang]['start_date'], value=default_start, min_value=df['Datetime'].min().date(), max_value=today, key="start_date_hist", format="DD/MM/YYYY")
+        start_date = st.date_input(t[lang]['start_date'], value=default_start, min_value=first_date, max_value=today, key="start_date_hist", format="DD/MM/YYYY")
     with col_date2: 
-        end_date = st.date_input(t[lang]['end_date'], value=today, min_value=df['Datetime'].min().date(), max_value=today, key="end_date_hist", format="DD/MM/YYYY")
+        end_date = st.date_input(t[lang]['end_date'], value=today, min_value=first_date, max_value=today, key="end_date_hist", format="DD/MM/YYYY")
         
     if start_date > end_date: st.error(t[lang]['date_error'])
     else:
-        mask = (df['Datetime'].dt.date >= start_date) & (df['Datetime'].dt.date <= end_date)
-        filtered_df = df.loc[mask]
-        if filtered_df.empty: st.warning(t[lang]['no_data_in_range'])
+        # --- Calculation FIX: Use daily averages for metrics to match the graph ---
+        # 1. Daily averages come precomputed from the aggregate tables
+        lo, hi = day_bounds(daily.index, start_date, end_date)
+        range_daily = daily['mean'].iloc[lo:hi]
+        record_rows(len(range_daily))
+        if range_daily.empty: st.warning(t[lang]['no_data_in_range'])
         else:
-            # --- Calculation FIX: Use daily averages for metrics to match the graph ---
-            # 1. Calculate daily averages first
-            daily_avg_df = filtered_df.groupby(filtered_df['Datetime'].dt.date)['PM2.5'].mean().reset_index()
-            daily_avg_df.rename(columns={'Datetime': 'Date', 'PM2.5': 'Avg PM2.5'}, inplace=True)
-            daily_avg_df = daily_avg_df.sort_values(by="Date")
-
             # 2. Calculate metrics based on these daily averages
-            avg_pm = daily_avg_df['Avg PM2.5'].mean()
-            max_pm = daily_avg_df['Avg PM2.5'].max()
-            min_pm = daily_avg_df['Avg PM2.5'].min()
+            avg_pm = range_daily.mean()
+            max_pm = range_daily.max()
+            min_pm = range_daily.min()
             
             mcol1, mcol2, mcol3 = st.columns(3)
             mcol1.metric(t[lang]['metric_avg'], f"{avg_pm:.1f} μg/m³")
             mcol2.metric(t[lang]['metric_max'], f"{max_pm:.1f} μg/m³")
             mcol3.metric(t[lang]['metric_min'], f"{min_pm:.1f} μg/m³")
-            
-            colors_hist = [get_aqi_level(pm, lang, t)[1] for pm in daily_avg_df['Avg PM2.5']]
-            
-            # --- INTELLIGENT TICK SAMPLING (Thai Dates) ---
-            # Goal: Show about 6-8 ticks on the axis to prevent crowding
-            total_days = len(daily_avg_df)
-            step = max(1, total_days // 7) 
-            
-            # Select subset of indices to show ticks for
-            tick_indices = list(range(0, total_days, step))
-            
-            # Prepare tickvals (dates) and ticktext (formatted labels)
-            tickvals = [daily_avg_df['Date'].iloc[i] for i in tick_indices]
-            
-            ticktext = []
-            for i in tick_indices:
-                d = daily_avg_df['Date'].iloc[i]
-                if lang == 'th':
-                    month_name = t['th']['month_names'][d.month - 1]
-                    short_month = month_name # Use full name for clarity or create short map if needed
-                    # If total range is huge (> 60 days), show Month + Year
-                    if total_days > 60:
-                        thai_year_short = str(d.year + 543)[2:]
-                        label = f"{short_month} {thai_year_short}"
-                    else:
-                        # Normal range: Day + Month
-                        label = f"{d.day} {short_month}"
-                else:
-                    if total_days > 60:
-                        label = d.strftime("%b '%y")
-                    else:
-                        label = d.strftime("%d %b")
-                ticktext.append(label)
-
-            # --- PREPARE TITLE ---
-            if lang == 'th':
-                start_date_str = f"{start_date.day} {t['th']['month_names'][start_date.month - 1]} {start_date.year + 543}"
-                end_date_str = f"{end_date.day} {t['th']['month_names'][end_date.month - 1]} {end_date.year + 543}"
-                daily_avg_df['HoverDate'] = daily_avg_df['Date'].apply(
-                    lambda d: f"{d.day} {t['th']['month_names'][d.month-1]} {d.year+543}"
-                )
-            else: 
-                start_date_str, end_date_str = start_date.strftime('%b %d, %Y'), end_date.strftime('%b %d, %Y')
-                daily_avg_df['HoverDate'] = daily_avg_df['Date'].apply(lambda d: d.strftime('%b %d, %Y'))
-            
-            title_text = f"{t[lang]['daily_avg_chart_title']} ({start_date_str} - {end_date_str})"
-            
-            # --- DYNAMIC TEXT ON BARS ---
-            # Only show numbers on bars if there are few days (< 15)
-            if total_days < 15:
-                bar_text = daily_avg_df['Avg PM2.5'].apply(lambda x: f'{x:.0f}')
-                text_position = 'outside'
-            else:
-                bar_text = None
-                text_position = 'none'
-
-            # --- CHART ---
-            fig_hist = go.Figure(go.Bar(
-                x=daily_avg_df['Date'],
-                y=daily_avg_df['Avg PM2.5'], 
-                name=t[lang]['avg_pm25_unit'], 
-                marker_color=colors_hist, 
-                marker=dict(cornerradius=5),
-                text=bar_text,
-                textposition=text_position,
-                hovertext=daily_avg_df['HoverDate'], 
-                hovertemplate="%{hovertext}<br>%{y:.1f} μg/m³<extra></extra>"
-            ))
-            
-            # Add Reference Line for Standard (37.5)
-            fig_hist.add_hline(
-                y=37.5, 
-                line_dash="dash", 
-                line_color="#9CA3AF", 
-                annotation_text="Standard (37.5)", 
-                annotation_position="bottom right",
-                annotation_font_size=10,
-                annotation_font_color="gray"
-            )
-            
-            # Updated Layout with Custom Ticks
-            fig_hist.update_layout(
-                title_text=title_text, 
-                font=dict(family="Sarabun"), 
-                yaxis_title=t[lang]['avg_pm25_unit'], 
-                template="plotly_white", 
-                plot_bgcolor='rgba(0,0,0,0)', 
-                margin=dict(l=20, r=20, t=60, b=20),
-                showlegend=False, 
-                xaxis=dict(
-                    tickmode='array',      # Use custom ticks
-                    tickvals=tickvals,     # Position of ticks
-                    ticktext=ticktext,     # Text of labels (Thai/Eng Smart)
-                    gridcolor='var(--border-color, #e9e9e9)', 
-                    fixedrange=True
-                ),
-                yaxis=dict(
-                    gridcolor='var(--border-color, #e9e9e9)', 
-                    fixedrange=True,
-                    zeroline=False,
-                    nticks=5,
-                    tickformat=".0f"
-                ),
-                uniformtext_minsize=8, 
-                uniformtext_mode='hide',
-                dragmode=False
-            )
+
+            fig_hist = _historical_figure(snapshot, start_date, end_date, lang, t, snapshot.version)
+            record_figure(fig_hist)
             st.plotly_chart(fig_hist, use_container_width=True, config={'displayModeBar': False, 'scrollZoom': False})
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE)
+def _historical_figure(_snapshot, start_date, end_date, lang, _t, version):
+    """
+    Average PM2.5 bar chart for start_date..end_date; cached per (range, lang, snapshot version).
+    Ranges with more days than HISTORY_POINT_BUDGET are drawn as weekly or monthly averages
+    (named in the title), with the peak daily mean of each bar in its hover label.
+    """
+    t = _t
+    daily = get_aggregates(_snapshot)['daily']
+    lo, hi = day_bounds(daily.index, start_date, end_date)
+    range_daily = daily['mean'].iloc[lo:hi]
+    total_days = len(range_daily)
+    resolution = choose_resolution(total_days)
+    if resolution == 'daily':
+        daily_avg_df = pd.DataFrame({'Date': range_daily.index, 'Avg PM2.5': range_daily.values})
+    else:
+        buckets = downsample_daily(range_daily, resolution)
+        daily_avg_df = pd.DataFrame({
+            'Date': buckets.index, 'Avg PM2.5': buckets['mean'].values, 'Peak PM2.5': buckets['max'].values,
+            'First': buckets['first'].values, 'Last': buckets['last'].values,
+        })
+
+    colors_hist = classify_pm25(daily_avg_df['Avg PM2.5'])[1].tolist()
+    
+    # --- INTELLIGENT TICK SAMPLING (Thai Dates) ---
+    # Goal: Show about 6-8 ticks on the axis to prevent crowding
+    total_points = len(daily_avg_df)
+    step = max(1, total_points // 7) 
+    
+    # Select subset of indices to show ticks for
+    tick_indices = list(range(0, total_points, step))
+    
+    # Prepare tickvals (dates) and ticktext (formatted labels)
+    tickvals = [daily_avg_df['Date'].iloc[i] for i in tick_indices]
+    
+    ticktext = []
+    for i in tick_indices:
+        d = daily_avg_df['Date'].iloc[i]
+        if lang == 'th':
+            month_name = t['th']['month_names'][d.month - 1]
+            short_month = month_name # Use full name for clarity or create short map if needed
+            # If total range is huge (> 60 days), show Month + Year
+            if total_days > 60:
+                thai_year_short = str(d.year + 543)[2:]
+                label = f"{short_month} {thai_year_short}"
+            else:
+                # Normal range: Day + Month
+                label = f"{d.day} {short_month}"
+        else:
+            if total_days > 60:
+                label = d.strftime("%b '%y")
+            else:
+                label = d.strftime("%d %b")
+        ticktext.append(label)
+    
+    # --- PREPARE TITLE ---
+    if lang == 'th':
+        def format_day(d): return f"{d.day} {t['th']['month_names'][d.month-1]} {d.year+543}"
+    else: 
+        def format_day(d): return d.strftime('%b %d, %Y')
+    start_date_str, end_date_str = format_day(start_date), format_day(end_date)
+    if resolution == 'daily':
+        daily_avg_df['HoverDate'] = daily_avg_df['Date'].apply(format_day)
+        hovertemplate = "%{hovertext}<br>%{y:.1f} μg/m³<extra></extra>"
+        customdata = None
+    else:
+        daily_avg_df['HoverDate'] = [f"{format_day(first)} - {format_day(last)}"
+                                     for first, last in zip(daily_avg_df['First'], daily_avg_df['Last'])]
+        hovertemplate = ("%{hovertext}<br>%{y:.1f} μg/m³"
+                         f"<br>{t[lang]['peak_daily_avg']}: " "%{customdata:.1f} μg/m³<extra></extra>")
+        customdata = daily_avg_df['Peak PM2.5']
+    
+    title_text = f"{t[lang][f'{resolution}_avg_chart_title']} ({start_date_str} - {end_date_str})"
+    
+    # --- DYNAMIC TEXT ON BARS ---
+    # Only show numbers on bars if there are few of them (< 15)
+    if total_points < 15:
+        bar_text = daily_avg_df['Avg PM2.5'].apply(lambda x: f'{x:.0f}')
+        text_position = 'outside'
+    else:
+        bar_text = None
+        text_position = 'none'
+    
+    # --- CHART ---
+    import plotly.graph_objects as go
+    fig_hist = go.Figure(go.Bar(
+        x=daily_avg_df['Date'],
+        y=daily_avg_df['Avg PM2.5'], 
+        name=t[lang]['avg_pm25_unit'], 
+        marker_color=colors_hist, 
+        marker=dict(cornerradius=5),
+        text=bar_text,
+        textposition=text_position,
+        hovertext=daily_avg_df['HoverDate'], 
+        customdata=customdata,
+        hovertemplate=hovertemplate
+    ))
+    
+    # Add Reference Line for Standard (37.5)
+    fig_hist.add_hline(
+        y=37.5, 
+        line_dash="dash", 
+        line_color="#9CA3AF", 
+        annotation_text="Standard (37.5)", 
+        annotation_position="bottom right",
+        annotation_font_size=10,
+        annotation_font_color="gray"
+    )
+    
+    # Updated Layout with Custom Ticks
+    fig_hist.update_layout(
+        title_text=title_text, 
+        font=dict(family="Sarabun"), 
+        yaxis_title=t[lang]['avg_pm25_unit'], 
+        template="plotly_white", 
+        plot_bgcolor='rgba(0,0,0,0)', 
+        margin=dict(l=20, r=20, t=60, b=20),
+        showlegend=False, 
+        xaxis=dict(
+            tickmode='array',      # Use custom ticks
+            tickvals=tickvals,     # Position of ticks
+            ticktext=ticktext,     # Text of labels (Thai/Eng Smart)
+            gridcolor='var(--border-color, #e9e9e9)', 
+            fixedrange=True
+        ),
+        yaxis=dict(
+            gridcolor='var(--border-color, #e9e9e9)', 
+            fixedrange=True,
+            zeroline=False,
+            nticks=5,
+            tickformat=".0f"
+        ),
+        uniformtext_minsize=8, 
+        uniformtext_mode='hide',
+        dragmode=False
+    )
+    return fig_hist
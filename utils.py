@@ -1,43 +1,59 @@
+import numpy as np
+
+# --- AQI Breakpoints ---
+# Inclusive upper bound of each level in μg/m³; anything above the last bound is level 5.
+# 0-15.0: Blue (Excellent)
+# 15.1-25.0: Green (Good)
+# 25.1-37.5: Yellow (Moderate -> เริ่มมีฝุ่นสะสม)
+# 37.6-75.0: Orange (Unhealthy -> ฝุ่นสูง)
+# >75.0: Red (Hazardous -> อันตรายมาก)
+AQI_BREAKPOINTS = np.array([15, 25, 37.5, 75])
+
+AQI_LEVELS = [
+    {'level_key': 'aqi_level_1', 'advice_key': 'advice_1', 'color': "#0099FF", 'emoji': "😊"},
+    {'level_key': 'aqi_level_2', 'advice_key': 'advice_2', 'color': "#2ECC71", 'emoji': "🙂"},
+    {'level_key': 'aqi_level_3', 'advice_key': 'advice_3', 'color': "#F1C40F", 'emoji': "😐"},
+    {'level_key': 'aqi_level_4', 'advice_key': 'advice_4', 'color': "#E67E22", 'emoji': "😷"},
+    {'level_key': 'aqi_level_5', 'advice_key': 'advice_5', 'color': "#E74C3C", 'emoji': "🤢"},
+]
+
+# One representative reading inside each level (1..5); used for the batch renderer's
+# --levels cards and the report card goldens
+LEVEL_READINGS = [8.0, 20.0, 31.0, 52.0, 96.0]
+
+AQI_COLORS = np.array([lvl['color'] for lvl in AQI_LEVELS])
+AQI_EMOJIS = np.array([lvl['emoji'] for lvl in AQI_LEVELS])
+
+def classify_pm25(values):
+    """
+    Vectorized AQI classification for an array/Series of PM2.5 values.
+    Returns (level_index, colors, emojis) as NumPy arrays, where level_index is 0-4
+    into AQI_LEVELS. NaN falls into the last level, like the scalar version.
+    """
+    level_idx = np.searchsorted(AQI_BREAKPOINTS, np.asarray(values, dtype=float), side='left')
+    return level_idx, AQI_COLORS[level_idx], AQI_EMOJIS[level_idx]
+
+def aqi_level_index(pm25):
+    """Returns the 0-4 AQI level index of a single PM2.5 value."""
+    return int(np.searchsorted(AQI_BREAKPOINTS, float(pm25), side='left'))
+
 def get_aqi_level(pm25, lang, t):
     """
     Converts a PM2.5 value into its corresponding AQI level, color, emoji, and structured advice
     based on the provided language and translation dictionary.
     """
+    aqi = AQI_LEVELS[aqi_level_index(pm25)]
+
     # Use the translation dictionary 't' for language-specific text
-    advice_dict = t[lang]['advice']
-    
-    # 0-15.0: Blue (Excellent)
-    if pm25 <= 15:
-        level_key = 'aqi_level_1'
-        advice_key = 'advice_1'
-        color = "#0099FF"
-        emoji = "😊"
-    # 15.1-25.0: Green (Good)
-    elif 15 < pm25 <= 25:
-        level_key = 'aqi_level_2'
-        advice_key = 'advice_2'
-        color = "#2ECC71"
-        emoji = "🙂"
-    # 25.1-37.5: Yellow (Moderate -> เริ่มมีฝุ่นสะสม)
-    elif 25 < pm25 <= 37.5:
-        level_key = 'aqi_level_3'
-        advice_key = 'advice_3'
-        color = "#F1C40F"
-        emoji = "😐"
-    # 37.6-75.0: Orange (Unhealthy -> ฝุ่นสูง)
-    elif 37.5 < pm25 <= 75:
-        level_key = 'aqi_level_4'
-        advice_key = 'advice_4'
-        color = "#E67E22"
-        emoji = "😷"
-    # >75.0: Red (Hazardous -> อันตรายมาก)
-    else: 
-        level_key = 'aqi_level_5'
-        advice_key = 'advice_5'
-        color = "#E74C3C"
-        emoji = "🤢"
-        
-    level = t[lang][level_key]
-    advice = advice_dict[advice_key]
-    
-    return level, color, emoji, advice
+    level = t[lang][aqi['level_key']]
+    advice = t[lang]['advice'][aqi['advice_key']]
+
+    return level, aqi['color'], aqi['emoji'], advice
+
+def format_reading_time(dt, lang, t):
+    """Timestamp shown in the header and on the report card (Buddhist Era year in Thai)."""
+    if lang == 'th':
+        thai_year = dt.year + 543
+        thai_month = t['th']['month_names'][dt.month - 1]
+        return dt.strftime(f"%d {thai_month} {thai_year}, %H:%M:%S")
+    return dt.strftime('%d %B %Y, %H:%M:%S')